@@ -1,8 +1,16 @@
 from ..tools.market_data import fetch_quotes
-from ..tools.cache import SQLiteTTLCache
+from ..tools.cache import get_app_cache
 from ..config import settings
 
-def market_intelligence(symbols):
-    cache = SQLiteTTLCache(settings.cache_db_path)
-    quotes = fetch_quotes(symbols, cache, settings.market_cache_ttl_seconds)
+def market_intelligence(symbols, provider=None):
+    cache = get_app_cache()
+    # None -> market-hours-aware TTL
+    ttl = settings.market_cache_ttl_seconds if settings.market_ttl_mode == "fixed" else None
+    quotes = fetch_quotes(
+        symbols,
+        cache,
+        ttl,
+        hard_ttl_seconds=settings.market_cache_hard_ttl_seconds,
+        provider=provider,
+    )
     return {"quotes": quotes}
\ No newline at end of file
@@ -4,7 +4,7 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from ..config import settings
-from ..tools.rag import get_rag_retriever
+from ..tools.rag import answer_with_cache, get_rag_retriever
 
 SYSTEM = (
     "You are a Finance Q&A education assistant. "
@@ -27,11 +27,12 @@ def rag_qa(
     history: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
     retriever = get_rag_retriever(category=category)
-    docs = retriever.get_relevant_documents(user_message)
+    retrieved = retriever.retrieve(user_message)
+    docs = retrieved.docs[:4]  # numbered [1]..[4] in the prompt
 
     citations: List[Dict[str, str]] = []
     context_parts = []
-    for i, d in enumerate(docs[:4], start=1):
+    for i, d in enumerate(docs, start=1):
         meta = d.metadata or {}
         src = meta.get("source", "unknown")
         title = meta.get("title", "Untitled")
@@ -64,8 +65,14 @@ def rag_qa(
         "4) What to do next (education-only)\n"
     )
 
-    answer = llm.invoke(
-        [SystemMessage(content=SYSTEM), HumanMessage(content=prompt)]
-    ).content
+    answer = answer_with_cache(
+        f"rag_qa:{category or 'All'}",
+        user_message,
+        history,
+        retriever,
+        retrieved,
+        lambda: llm.invoke([SystemMessage(content=SYSTEM), HumanMessage(content=prompt)]).content,
+        prompt_docs=docs,
+    )
 
     return {"answer": answer, "citations": citations}
\ No newline at end of file
@@ -5,7 +5,7 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from ..config import settings
-from ..tools.rag import get_rag_retriever
+from ..tools.rag import answer_with_cache, get_rag_retriever
 
 SYSTEM = (
     "You are a Tax Education Agent. Provide education-only explanations. "
@@ -32,12 +32,13 @@ def tax_qa(
 ) -> Dict[str, Any]:
     # Hard filter to Tax category
     retriever = get_rag_retriever(category="Tax")
-    docs = retriever.get_relevant_documents(user_message)
+    retrieved = retriever.retrieve(user_message)
+    docs = retrieved.docs[:5]  # numbered [1]..[5] in the prompt
 
     citations: List[Dict[str, str]] = []
     context_parts = []
 
-    for i, d in enumerate(docs[:5], start=1):
+    for i, d in enumerate(docs, start=1):
         meta = d.metadata or {}
         title = meta.get("title", "Untitled")
         src = meta.get("source", "unknown")
@@ -70,7 +71,15 @@ def tax_qa(
         "not present in context, explicitly say what info is missing.\n"
     )
 
-    answer = llm.invoke([SystemMessage(content=SYSTEM), HumanMessage(content=prompt)]).content
+    answer = answer_with_cache(
+        "tax_qa",
+        user_message,
+        history,
+        retriever,
+        retrieved,
+        lambda: llm.invoke([SystemMessage(content=SYSTEM), HumanMessage(content=prompt)]).content,
+        prompt_docs=docs,
+    )
     return {"answer": answer, "citations": citations}
 
 
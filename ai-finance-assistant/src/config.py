@@ -27,12 +27,26 @@ def get_faiss_index_dir() -> Path:
     faiss_dir.mkdir(parents=True, exist_ok=True)
     return faiss_dir
 
+def get_embedding_cache_path() -> Path:
+    """Get the content-addressed embedding cache path"""
+    return get_data_dir() / "knowledge_base" / "embedding_cache.sqlite3"
+
+def get_answer_cache_path() -> Path:
+    """Get the semantic LLM answer cache path"""
+    return get_data_dir() / "answer_cache.sqlite3"
+
 def get_cache_db_path() -> Path:
     """Get the cache database path"""
     cache_file = get_data_dir() / "cache.sqlite3"
     cache_file.parent.mkdir(parents=True, exist_ok=True)
     return cache_file
 
+def get_market_history_dir() -> Path:
+    """Get the local OHLCV price-history store directory"""
+    history_dir = get_data_dir() / "market_history"
+    history_dir.mkdir(parents=True, exist_ok=True)
+    return history_dir
+
 def get_session_db_path() -> Path:
     """Get the session database path for memory persistence"""
     session_dir = get_data_dir() / "session"
@@ -52,10 +66,74 @@ class Settings(BaseModel):
     # RAG index paths - use environment variables or defaults
     kb_dir: Path = Path(os.getenv("KB_DIR", str(get_kb_dir())))
     faiss_index_dir: Path = Path(os.getenv("FAISS_INDEX_DIR", str(get_faiss_index_dir())))
+    # ANN index: "flat" (exact), "hnsw", "hnswsq", "ivf", "ivfsq", "ivfpq"; small corpora (<10k chunks) stay flat
+    faiss_index_type: str = os.getenv("FAISS_INDEX_TYPE", "flat")
+    faiss_nlist: int = int(os.getenv("FAISS_NLIST", "0"))  # IVF lists, 0 = ~4*sqrt(N)
+    faiss_pq_m: int = int(os.getenv("FAISS_PQ_M", "0"))  # PQ sub-quantizers, 0 = dim/16
+    faiss_hnsw_m: int = int(os.getenv("FAISS_HNSW_M", "32"))
+    faiss_train_sample: int = int(os.getenv("FAISS_TRAIN_SAMPLE", "50000"))  # vectors used to train IVF/PQ
+    faiss_nprobe: int = int(os.getenv("FAISS_NPROBE", "16"))  # IVF lists scanned per query
+    faiss_ef_search: int = int(os.getenv("FAISS_EF_SEARCH", "64"))  # HNSW search breadth
+    # Map index.faiss read-only instead of reading it into each process's heap (workers share the pages)
+    faiss_mmap: bool = os.getenv("FAISS_MMAP", "false").lower() == "true"
+    # "openai" (OpenAIEmbeddings) or "local" (offline hashed n-gram embeddings, see tools/local_embeddings.py)
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "openai")
+    local_embedding_dim: int = int(os.getenv("LOCAL_EMBEDDING_DIM", "1024"))
+    # "hybrid" (BM25 + dense, lexical fast path), "dense" (FAISS only) or "lexical" (BM25 only)
+    rag_retrieval_mode: str = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+    rag_fetch_k: int = int(os.getenv("RAG_FETCH_K", "20"))  # candidates per ranking before fusion
+    rag_lexical_margin: float = float(os.getenv("RAG_LEXICAL_MARGIN", "1.5"))  # top BM25 / runner-up to skip dense
+    # Query-level retrieval cache (normalized question + category -> doc ids), keyed by KB index version
+    rag_retrieval_cache_enabled: bool = os.getenv("RAG_RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+    rag_retrieval_cache_ttl_seconds: int = int(os.getenv("RAG_RETRIEVAL_CACHE_TTL_SECONDS", "86400"))
+    # Semantic answer cache for rag_qa / tax_qa: same retrieved docs + KB version + near-identical question
+    rag_answer_cache_enabled: bool = os.getenv("RAG_ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    rag_answer_cache_path: Path = Path(os.getenv("RAG_ANSWER_CACHE_PATH", str(get_answer_cache_path())))
+    rag_answer_cache_threshold: float = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+    rag_answer_cache_ttl_seconds: int = int(os.getenv("RAG_ANSWER_CACHE_TTL_SECONDS", str(7 * 86400)))
+    rag_answer_cache_max_entries: int = int(os.getenv("RAG_ANSWER_CACHE_MAX_ENTRIES", "5000"))
+    # Chunk embeddings keyed by sha256(model + text); rebuilds only embed unseen chunks
+    embedding_cache_path: Path = Path(os.getenv("EMBEDDING_CACHE_PATH", str(get_embedding_cache_path())))
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    # KB build pipeline: chunking (and local embedding) processes, chunks per embedding call, calls in flight.
+    # 1 = chunk in-process (refreshes inside the app), 0 = os.cpu_count(); scripts/build_kb uses 0 unless this is set
+    kb_build_workers: int = int(os.getenv("KB_BUILD_WORKERS", "1"))
+    kb_embed_batch_size: int = int(os.getenv("KB_EMBED_BATCH_SIZE", "256"))
+    kb_embed_concurrency: int = int(os.getenv("KB_EMBED_CONCURRENCY", "4"))
 
     # Caching
     cache_db_path: Path = Path(os.getenv("CACHE_DB_PATH", str(get_cache_db_path())))
+    cache_memory_max_entries: int = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "1024"))  # in-process LRU tier
+    cache_memory_max_bytes: int = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(8 * 1024 * 1024)))
+    cache_max_db_bytes: int = int(os.getenv("CACHE_MAX_DB_BYTES", str(64 * 1024 * 1024)))  # 0 = unbounded
+    cache_eviction_policy: str = os.getenv("CACHE_EVICTION_POLICY", "lru")  # "lru" or "lfu"
+    cache_serializer: str = os.getenv("CACHE_SERIALIZER", "packed")  # "json", "packed" or "packed+zlib"
+    cache_sweep_interval_seconds: int = int(os.getenv("CACHE_SWEEP_INTERVAL_SECONDS", "300"))  # 0 = no sweeper
     market_cache_ttl_seconds: int = int(os.getenv("MARKET_CACHE_TTL_SECONDS", "1800"))  # 30 minutes
+    # Stale quotes are served (and refreshed in the background) until this hard TTL
+    market_cache_hard_ttl_seconds: int = int(os.getenv("MARKET_CACHE_HARD_TTL_SECONDS", "3600"))  # 1 hour
+    # "adaptive" = TTL from the exchange calendar (see tools/market_calendar.py), "fixed" = MARKET_CACHE_TTL_SECONDS
+    market_ttl_mode: str = os.getenv("MARKET_TTL_MODE", "adaptive")
+    market_intraday_ttl_seconds: int = int(os.getenv("MARKET_INTRADAY_TTL_SECONDS", "60"))  # in-session quote TTL
+    market_negative_ttl_seconds: int = int(os.getenv("MARKET_NEGATIVE_TTL_SECONDS", "120"))  # failed lookups
+    # Currency + share count behind batch-path market caps; both change rarely
+    market_profile_ttl_seconds: int = int(os.getenv("MARKET_PROFILE_TTL_SECONDS", "86400"))  # 1 day
+
+    # Market data fetching
+    market_provider: str = os.getenv("MARKET_PROVIDER", "yfinance")  # "yfinance" or "replay" (offline fixtures)
+    market_replay_dir: Path = Path(os.getenv("MARKET_REPLAY_DIR", str(get_data_dir() / "market_replay")))
+    market_replay_latency_ms: float = float(os.getenv("MARKET_REPLAY_LATENCY_MS", "0"))
+    market_replay_failure_rate: float = float(os.getenv("MARKET_REPLAY_FAILURE_RATE", "0"))
+    market_replay_seed: int = int(os.getenv("MARKET_REPLAY_SEED", "0"))
+    market_fetch_workers: int = int(os.getenv("MARKET_FETCH_WORKERS", "8"))
+    market_rate_limit_per_sec: float = float(os.getenv("MARKET_RATE_LIMIT_PER_SEC", "4"))  # shared across sessions
+    market_rate_limit_burst: int = int(os.getenv("MARKET_RATE_LIMIT_BURST", "8"))
+    market_breaker_failure_threshold: int = int(os.getenv("MARKET_BREAKER_FAILURE_THRESHOLD", "5"))
+    market_breaker_reset_seconds: int = int(os.getenv("MARKET_BREAKER_RESET_SECONDS", "60"))
+
+    # Local OHLCV history store (only bars newer than the last stored one are downloaded)
+    market_history_dir: Path = Path(os.getenv("MARKET_HISTORY_DIR", str(get_market_history_dir())))
+    market_history_backfill_period: str = os.getenv("MARKET_HISTORY_BACKFILL_PERIOD", "1y")
 
     # Model
     llm_model: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
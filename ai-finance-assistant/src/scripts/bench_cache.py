@@ -0,0 +1,84 @@
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from src.tools.cache import SQLiteTTLCache
+
+
+class _ConnectPerOpCache:
+    """The previous behaviour: a fresh sqlite3.connect() for every get/set."""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at INTEGER NOT NULL)"
+            )
+            conn.commit()
+
+    def get(self, key):
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl_seconds):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), int(time.time()) + ttl_seconds),
+            )
+            conn.commit()
+
+
+def _payload(i):
+    return {
+        "symbol": f"SYM{i}",
+        "last_price": 100.0 + i,
+        "previous_close": 99.0 + i,
+        "history_5d": [100.0 + i + d for d in range(5)],
+        "history_dates": [f"2024-01-0{d + 1}" for d in range(5)],
+        "source": "yfinance",
+    }
+
+
+def _bench(cache, n, hot=100):
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache.set(f"quote:SYM{i}", _payload(i), 600)
+    set_us = (time.perf_counter() - t0) / n * 1e6
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache.get(f"quote:SYM{i}")
+    get_us = (time.perf_counter() - t0) / n * 1e6
+
+    # Same few keys over and over (a portfolio being re-rendered)
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache.get(f"quote:SYM{i % hot}")
+    hot_us = (time.perf_counter() - t0) / n * 1e6
+    return set_us, get_us, hot_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-op latency of the SQLite quote cache.")
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = (
+            ("connect-per-op (before)", lambda p: _ConnectPerOpCache(p)),
+            ("pooled + WAL", lambda p: SQLiteTTLCache(p, memory_max_entries=0)),
+            ("pooled + WAL + memory LRU", lambda p: SQLiteTTLCache(p)),
+        )
+        for i, (label, make) in enumerate(variants):
+            cache = make(Path(tmp) / f"bench{i}.sqlite3")
+            set_us, get_us, hot_us = _bench(cache, args.n)
+            print(f"{label:<26} set {set_us:8.1f} us/op   get {get_us:8.1f} us/op   hot get {hot_us:8.1f} us/op")
+            if hasattr(cache, "stats"):
+                print(f"{'':<26} {cache.stats()}")
+            if hasattr(cache, "close"):
+                cache.close()
@@ -0,0 +1,59 @@
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.tools.cache import SQLiteTTLCache
+from src.tools.serializers import get_serializer
+
+
+def _quote(i, days, rng):
+    price = 50 + rng.random() * 400
+    hist = [price * (1 + rng.gauss(0, 0.01)) for _ in range(days)]
+    return {
+        "symbol": f"SYM{i}",
+        "last_price": hist[-1],
+        "previous_close": hist[-2],
+        "market_cap": rng.random() * 1e12,
+        "currency": "USD",
+        "source": "yfinance",
+        "cache_hit": False,
+        "stale": False,
+        "fetched_at": 1700000000 + i,
+        "history_5d": hist,
+        "history_dates": [f"2024-{1 + d // 28:02d}-{1 + d % 28:02d}" for d in range(days)],
+        "pct_change": (hist[-1] - hist[-2]) / hist[-2] * 100,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode/decode throughput and DB size per cache serializer.")
+    parser.add_argument("-n", type=int, default=1000, help="payloads per run")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'history':>8} {'serializer':<12} {'bytes/val':>10} {'enc/s':>10} {'dec/s':>10} {'db KiB':>8}")
+    for days in (5, 60, 250):
+        payloads = [_quote(i, days, rng) for i in range(args.n)]
+        for name in ("json", "packed", "packed+zlib"):
+            ser = get_serializer(name)
+
+            t0 = time.perf_counter()
+            blobs = [ser.dumps(p) for p in payloads]
+            enc = args.n / (time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            for b in blobs:
+                ser.loads(b)
+            dec = args.n / (time.perf_counter() - t0)
+
+            size = sum(len(b) for b in blobs) / args.n
+
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = SQLiteTTLCache(Path(tmp) / "c.sqlite3", serializer=ser, memory_max_entries=0)
+                cache.set_many({p["symbol"]: p for p in payloads}, 600)
+                db_kib = cache.db_bytes() / 1024
+                cache.close()
+
+            print(f"{days:>8} {name:<12} {size:>10.0f} {enc:>10.0f} {dec:>10.0f} {db_kib:>8.0f}")
@@ -0,0 +1,98 @@
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from src.tools.faiss_index import read_index
+
+
+def _mem() -> dict:
+    """RSS split into private (anon) and file-backed pages, plus PSS (shared pages divided by sharers)."""
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                key, val = line.split(":")
+                out[key] = int(val.split()[0]) / 1024
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    out["Pss"] = int(line.split()[1]) / 1024
+    except OSError:
+        out["Pss"] = float("nan")
+    return out
+
+
+def _worker(path, mmap, dim, queries, barrier, results):
+    before = _mem()
+    t0 = time.perf_counter()
+    index = read_index(path, mmap=mmap)
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    rng = np.random.default_rng(0)
+    xq = rng.random((queries, dim), dtype=np.float32)
+    t0 = time.perf_counter()
+    index.search(xq, 5)
+    search_ms = (time.perf_counter() - t0) * 1000 / queries
+
+    # Measure while every worker still holds the index, so shared pages are split between them
+    barrier.wait()
+    after = _mem()
+    results.put(
+        {
+            "load_ms": load_ms,
+            "search_ms": search_ms,
+            "anon_mb": after["RssAnon"] - before["RssAnon"],
+            "file_mb": after["RssFile"] - before["RssFile"],
+            "pss_mb": after["Pss"] - before["Pss"],
+        }
+    )
+    barrier.wait()
+
+
+def _run(path, mmap, dim, workers, queries):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(path, mmap, dim, queries, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {k: sum(r[k] for r in rows) / len(rows) for k in rows[0]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time and memory of eager vs mmap FAISS loading.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2, help="processes loading the same index at once")
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = Path(tmp) / f"flat_{n}.faiss"
+            index = faiss.IndexFlatL2(args.dim)
+            rng = np.random.default_rng(n)
+            for start in range(0, n, 100_000):
+                index.add(rng.random((min(100_000, n - start), args.dim), dtype=np.float32))
+            faiss.write_index(index, str(path))
+            del index
+            size_mb = path.stat().st_size / 1e6
+
+            print(f"\n{n:>9,} chunks x {args.dim}d  ({size_mb:,.0f} MB on disk, {args.workers} workers)")
+            for label, mmap in (("eager", False), ("mmap", True)):
+                r = _run(path, mmap, args.dim, args.workers, args.queries)
+                print(
+                    f"  {label:<6} load {r['load_ms']:9.1f} ms   search {r['search_ms']:8.2f} ms/q   "
+                    f"private {r['anon_mb']:8.1f} MB   file-backed {r['file_mb']:8.1f} MB   "
+                    f"PSS/worker {r['pss_mb']:8.1f} MB"
+                )
+            path.unlink()
@@ -0,0 +1,53 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from src.tools.cache import SQLiteTTLCache
+from src.tools.market_data import fetch_quotes, quote_fetch_stats
+from src.tools.quote_providers import ReplayProvider
+from src.config import settings
+
+
+def _run(label, provider, symbols, cache, **kwargs):
+    t0 = time.perf_counter()
+    calls0 = provider.calls
+    quotes = fetch_quotes(symbols, cache, 60, provider=provider, **kwargs)
+    elapsed = (time.perf_counter() - t0) * 1000
+    errors = sum(1 for q in quotes.values() if "error" in q)
+    hits = sum(1 for q in quotes.values() if q.get("cache_hit"))
+    print(
+        f"{label:<28} {elapsed:9.1f} ms  provider_calls={provider.calls - calls0:<4} "
+        f"cache_hits={hits:<4} errors={errors}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the quote path using the replay provider.")
+    parser.add_argument("--fixtures", default=str(settings.market_replay_dir))
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=settings.market_fetch_workers)
+    args = parser.parse_args()
+
+    symbols = sorted(p.name for p in Path(args.fixtures).iterdir() if p.is_dir())
+    if not symbols:
+        raise SystemExit(f"No fixtures in {args.fixtures} (run python -m src.scripts.record_quote_fixtures)")
+    print(f"{len(symbols)} symbols, latency={args.latency_ms}ms, failure_rate={args.failure_rate}\n")
+
+    scenarios = [
+        ("sequential (no batch)", {"batch": False, "max_workers": 1}),
+        ("concurrent (no batch)", {"batch": False, "max_workers": args.workers}),
+        ("batched", {"batch": True, "max_workers": args.workers}),
+    ]
+    for label, kwargs in scenarios:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Fresh provider per scenario so the local history store starts cold too
+            provider = ReplayProvider(args.fixtures, latency_ms=args.latency_ms, failure_rate=args.failure_rate)
+            provider.name = f"replay-bench-{Path(tmp).name}"
+            settings.market_history_dir = Path(tmp) / "history"
+            cache = SQLiteTTLCache(Path(tmp) / "cache.sqlite3")
+            _run(f"{label} / cold", provider, symbols, cache, **kwargs)
+            _run(f"{label} / warm", provider, symbols, cache, **kwargs)
+
+    print(f"\nsingle-flight: {quote_fetch_stats(provider)}")
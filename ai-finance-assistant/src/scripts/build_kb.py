@@ -1,5 +1,47 @@
-from src.tools.rag import build_or_load_faiss
+import os
+import time
+
+from src.config import settings
+from src.tools.rag import refresh_kb_index
+
+_PROGRESS_EVERY_SECONDS = 5.0
+
+
+def _progress_printer():
+    last = [time.perf_counter()]
+
+    def show(stats) -> None:
+        now = time.perf_counter()
+        if now - last[0] < _PROGRESS_EVERY_SECONDS:
+            return
+        last[0] = now
+        print(
+            f"  ... {stats.files} files, {stats.chunks} chunks, {stats.vectors} embedded "
+            f"({stats.rate(stats.vectors):.0f} embeddings/s)",
+            flush=True,
+        )
+
+    return show
+
 
 if __name__ == "__main__":
-    build_or_load_faiss()
-    print("KB FAISS index built/loaded successfully.")
\ No newline at end of file
+    # Offline builds chunk on every CPU unless KB_BUILD_WORKERS is set explicitly
+    workers = settings.kb_build_workers if os.getenv("KB_BUILD_WORKERS") else 0
+    report = refresh_kb_index(progress=_progress_printer(), workers=workers)
+    print(
+        f"KB FAISS index v{report['index_version']} up to date: "
+        f"+{report['added']} added, ~{report['changed']} changed, -{report['removed']} removed, "
+        f"{report['unchanged']} unchanged ({report['chunks_embedded']} chunks embedded, "
+        f"{report['chunks_deleted']} deleted, full_rebuild={report['full_rebuild']}) "
+        f"in {report['seconds']}s"
+    )
+    pipeline = report["pipeline"]
+    if pipeline["files"]:
+        print(
+            f"Pipeline: {pipeline['files']} files -> {pipeline['chunks']} chunks in {pipeline['batches']} batches, "
+            f"{pipeline['seconds']}s ({pipeline['chunks_per_second']} chunks/s, "
+            f"{pipeline['embeddings_per_second']} embeddings/s)"
+        )
+    if report["embedding_cache"]:
+        cache = report["embedding_cache"]
+        print(f"Embedding cache: {cache['hits']} hits, {cache['misses']} misses (embedded via API)")
@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+from src.config import settings
+from src.tools.docstore import docstore_dir, import_pickle_docstore
+
+if __name__ == "__main__":
+    # Converts a LangChain index.pkl into the mmap docstore (index.faiss is left as is)
+    index_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(settings.faiss_index_dir)
+    store = import_pickle_docstore(index_dir)
+    print(f"Imported {len(store)} chunks into {docstore_dir(index_dir)} ({store.live_bytes()} bytes of text)")
+    print("index.pkl is no longer read and can be deleted.")
@@ -0,0 +1,11 @@
+import sys
+
+from src.config import settings
+from src.tools.cache import get_cache
+
+if __name__ == "__main__":
+    namespaces = sys.argv[1:] or ["quote", "quote_error"]
+    cache = get_cache(settings.cache_db_path)
+    for ns in namespaces:
+        gen = cache.invalidate_namespace(ns)
+        print(f"{ns}: now at generation {gen}")
@@ -0,0 +1,11 @@
+import sys
+
+from src.config import settings
+from src.tools.quote_providers import record_fixtures
+
+if __name__ == "__main__":
+    symbols = sys.argv[1:] or ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "SPY", "QQQ", "VTI"]
+    status = record_fixtures(symbols, settings.market_replay_dir)
+    for sym, result in status.items():
+        print(f"{sym}: {result}")
+    print(f"Replay fixtures written to {settings.market_replay_dir}")
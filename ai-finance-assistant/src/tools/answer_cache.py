@@ -0,0 +1,222 @@
+# src/tools/answer_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# Follow-ups that only make sense with the previous turns ("what about a Roth?", "is it taxed?")
+_FOLLOW_UP_STARTS = ("what about", "how about", "and ", "also", "so ", "then ", "but ", "why not", "same ")
+_ANAPHORA = frozenset(
+    "it its it's this that these those they them their there he she his her above previous same former latter".split()
+)
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def depends_on_history(question: str, history: Optional[Sequence[str]]) -> bool:
+    """
+    True when the conversation so far plausibly changes what the question means,
+    so a cached answer to the same words asked standalone would be wrong.
+    """
+    if not history:
+        return False
+    q = (question or "").strip().lower()
+    if q.startswith(_FOLLOW_UP_STARTS):
+        return True
+    words = _WORD_RE.findall(q)
+    if len(words) < 4:
+        return True  # "why?", "and for 2024?" ...
+    return any(w in _ANAPHORA for w in words)
+
+
+def question_key(normalized_question: str) -> str:
+    return hashlib.sha1(normalized_question.encode("utf-8")).hexdigest()
+
+
+def doc_signature(doc_ids: Sequence[str]) -> str:
+    # Ordered: the prompt numbers its sources for [n] citations, so rank order changes the answer
+    return hashlib.sha1("\n".join(doc_ids).encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    LLM answers keyed by (scope, KB version, retrieved doc set) and matched by
+    cosine similarity of the question embedding. Questions answered without an
+    embedding (lexical retrieval) are matched on their normalized text instead.
+    Entries expire after a TTL and the table is trimmed to `max_entries` by
+    least-recent use.
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 5000, ttl_seconds: int = 7 * 86400, threshold: float = 0.95):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("PRAGMA synchronous=NORMAL;")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                scope TEXT NOT NULL,
+                kb_version INTEGER NOT NULL,
+                doc_sig TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                payload TEXT NOT NULL,
+                expires_at INTEGER NOT NULL,
+                accessed_at INTEGER NOT NULL
+            )
+            """
+        )
+        # Older DBs were created without it
+        cols = {row[1] for row in self._db.execute("PRAGMA table_info(answers)")}
+        if "question_key" not in cols:
+            self._db.execute("ALTER TABLE answers ADD COLUMN question_key TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_answers_lookup ON answers(scope, kb_version, doc_sig);")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_answers_accessed_at ON answers(accessed_at);")
+        self._db.commit()
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def lookup(
+        self,
+        scope: str,
+        embedding: Optional[Sequence[float]],
+        doc_ids: Sequence[str],
+        kb_version: int,
+        question: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cached payload of the most similar question with the same context, if
+        above threshold. With embedding=None, `question` (normalized text) must
+        match exactly.
+        """
+        if embedding is None:
+            return self._lookup_exact(scope, question or "", doc_ids, kb_version)
+        now = int(time.time())
+        query = self._unit(embedding)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, embedding, payload FROM answers "
+                "WHERE scope = ? AND kb_version = ? AND doc_sig = ? AND expires_at > ?",
+                (scope, int(kb_version), doc_signature(doc_ids), now),
+            ).fetchall()
+            best_id, best_sim, best_payload = None, -1.0, None
+            for row_id, blob, payload in rows:
+                vec = np.frombuffer(blob, dtype="<f4")
+                if vec.shape != query.shape:
+                    continue
+                sim = float(np.dot(query, vec))
+                if sim > best_sim:
+                    best_id, best_sim, best_payload = row_id, sim, payload
+            if best_id is None or best_sim < self.threshold:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE answers SET accessed_at = ? WHERE id = ?", (now, best_id))
+            self._db.commit()
+            self.hits += 1
+        out = json.loads(best_payload)
+        out["similarity"] = best_sim
+        return out
+
+    def _lookup_exact(
+        self, scope: str, question: str, doc_ids: Sequence[str], kb_version: int
+    ) -> Optional[Dict[str, Any]]:
+        now = int(time.time())
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, payload FROM answers "
+                "WHERE scope = ? AND kb_version = ? AND doc_sig = ? AND question_key = ? AND expires_at > ? "
+                "ORDER BY id DESC LIMIT 1",
+                (scope, int(kb_version), doc_signature(doc_ids), question_key(question), now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE answers SET accessed_at = ? WHERE id = ?", (now, row[0]))
+            self._db.commit()
+            self.hits += 1
+        out = json.loads(row[1])
+        out["similarity"] = 1.0
+        return out
+
+    def store(
+        self,
+        scope: str,
+        embedding: Optional[Sequence[float]],
+        doc_ids: Sequence[str],
+        kb_version: int,
+        payload: Dict[str, Any],
+        question: Optional[str] = None,
+    ) -> None:
+        """Without an embedding the entry is only found again by the exact normalized `question`."""
+        now = int(time.time())
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO answers (scope, kb_version, doc_sig, embedding, question_key, payload, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    scope,
+                    int(kb_version),
+                    doc_signature(doc_ids),
+                    b"" if embedding is None else self._unit(embedding).astype("<f4").tobytes(),
+                    question_key(question or ""),
+                    json.dumps(payload),
+                    now + self.ttl_seconds,
+                    now,
+                ),
+            )
+            self._trim(now)
+            self._db.commit()
+
+    def _trim(self, now: int) -> None:
+        self._db.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+        if self.max_entries > 0:
+            self._db.execute(
+                "DELETE FROM answers WHERE id IN ("
+                "SELECT id FROM answers ORDER BY accessed_at DESC, id DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0])
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+
+
+_CACHES: Dict[str, SemanticAnswerCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_answer_cache(db_path: Path, **kwargs) -> SemanticAnswerCache:
+    """One SemanticAnswerCache per db file per process; kwargs only apply on first use."""
+    key = str(Path(db_path).resolve())
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = SemanticAnswerCache(db_path, **kwargs)
+            _CACHES[key] = cache
+        return cache
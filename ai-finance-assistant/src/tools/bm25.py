@@ -0,0 +1,211 @@
+# src/tools/bm25.py
+from __future__ import annotations
+
+import os
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .local_embeddings import tokenize
+
+
+class BM25Index:
+    """
+    Okapi BM25 over KB chunks with a CSR inverted index (numpy arrays, no pickle).
+    Doc ids are the FAISS docstore ids so hits map straight onto stored chunks.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        indptr: np.ndarray,
+        postings_doc: np.ndarray,
+        postings_tf: np.ndarray,
+        doc_len: np.ndarray,
+        doc_ids: np.ndarray,
+        doc_categories: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.terms = terms
+        self.indptr = indptr
+        self.postings_doc = postings_doc
+        self.postings_tf = postings_tf
+        self.doc_len = doc_len
+        self.doc_ids = doc_ids
+        self.doc_categories = doc_categories
+        self.k1 = k1
+        self.b = b
+
+        self._term_index: Dict[str, int] = {str(t): i for i, t in enumerate(terms)}
+        n = max(len(doc_ids), 1)
+        df = np.diff(indptr).astype(np.float64)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(doc_len.mean()) if len(doc_len) else 1.0
+        self._norm = (k1 * (1.0 - b + b * doc_len / max(avgdl, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str, str]]) -> "BM25Index":
+        """
+        docs: (doc_id, text, category) triples, consumed as a stream. Postings are
+        collected in flat int arrays (not per-term lists of tuples) and sorted into
+        CSR at the end, so memory stays close to the final index size.
+        """
+        vocab: Dict[str, int] = {}
+        post_term, post_doc, post_tf = array("i"), array("i"), array("i")
+        doc_len: List[int] = []
+        doc_ids: List[str] = []
+        categories: List[str] = []
+        for i, (doc_id, text, category) in enumerate(docs):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            categories.append(category or "Uncategorized")
+            doc_len.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                post_term.append(vocab.setdefault(tok, len(vocab)))
+                post_doc.append(i)
+                post_tf.append(tf)
+
+        terms = sorted(vocab)
+        rank = np.empty(len(vocab), dtype=np.int64)
+        rank[[vocab[t] for t in terms]] = np.arange(len(terms))
+        term_rank = rank[np.frombuffer(post_term, dtype=np.int32)] if post_term else np.zeros(0, dtype=np.int64)
+        # Stable sort keeps each term's postings in doc order
+        order = np.argsort(term_rank, kind="stable")
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_rank, minlength=len(terms)), out=indptr[1:])
+        postings_doc = np.frombuffer(post_doc, dtype=np.int32)[order].astype(np.int32)
+        postings_tf = np.frombuffer(post_tf, dtype=np.int32)[order].astype(np.float32)
+
+        return cls(
+            terms=np.asarray(terms, dtype=str),
+            indptr=indptr,
+            postings_doc=postings_doc,
+            postings_tf=postings_tf,
+            doc_len=np.asarray(doc_len, dtype=np.float32),
+            doc_ids=np.asarray(doc_ids, dtype=str),
+            doc_categories=np.asarray(categories, dtype=str),
+        )
+
+    def updated(self, removed: Iterable[str], added: Iterable[Tuple[str, str, str]]) -> "BM25Index":
+        """
+        New index without the `removed` doc ids and with `added` (doc_id, text,
+        category) appended. Only the added texts are tokenised; the existing
+        postings are filtered and merged as arrays, so an incremental KB refresh
+        never re-reads or re-tokenises unchanged chunks.
+        """
+        removed = list(removed)
+        keep = ~np.isin(self.doc_ids, removed) if removed else np.ones(len(self.doc_ids), dtype=bool)
+        new_pos = np.cumsum(keep) - 1  # old doc index -> index after removal (where kept)
+        n_kept = int(keep.sum())
+
+        fresh = BM25Index.build(added)
+        terms = np.union1d(self.terms, fresh.terms)
+        old_terms = np.repeat(np.searchsorted(terms, self.terms), np.diff(self.indptr))
+        new_terms = np.repeat(np.searchsorted(terms, fresh.terms), np.diff(fresh.indptr))
+
+        live = keep[self.postings_doc]
+        post_term = np.concatenate([old_terms[live], new_terms])
+        post_doc = np.concatenate([new_pos[self.postings_doc[live]], fresh.postings_doc + n_kept]).astype(np.int32)
+        post_tf = np.concatenate([self.postings_tf[live], fresh.postings_tf]).astype(np.float32)
+
+        # Old docs all precede the new ones, so a stable sort keeps each term's postings in doc order
+        order = np.argsort(post_term, kind="stable")
+        counts = np.bincount(post_term, minlength=len(terms))
+        used = counts > 0  # terms whose every posting was removed leave the vocabulary
+        indptr = np.zeros(int(used.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[used], out=indptr[1:])
+
+        return BM25Index(
+            terms=terms[used],
+            indptr=indptr,
+            postings_doc=post_doc[order],
+            postings_tf=post_tf[order],
+            doc_len=np.concatenate([self.doc_len[keep], fresh.doc_len]).astype(np.float32),
+            doc_ids=np.concatenate([self.doc_ids[keep], fresh.doc_ids]).astype(str),
+            doc_categories=np.concatenate([self.doc_categories[keep], fresh.doc_categories]).astype(str),
+            k1=self.k1,
+            b=self.b,
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(
+            tmp,
+            terms=self.terms,
+            indptr=self.indptr,
+            postings_doc=self.postings_doc,
+            postings_tf=self.postings_tf,
+            doc_len=self.doc_len,
+            doc_ids=self.doc_ids,
+            doc_categories=self.doc_categories,
+            params=np.asarray([self.k1, self.b], dtype=np.float64),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(Path(path), allow_pickle=False) as z:
+            k1, b = (float(x) for x in z["params"])
+            return cls(
+                terms=z["terms"],
+                indptr=z["indptr"],
+                postings_doc=z["postings_doc"],
+                postings_tf=z["postings_tf"],
+                doc_len=z["doc_len"],
+                doc_ids=z["doc_ids"],
+                doc_categories=z["doc_categories"],
+                k1=k1,
+                b=b,
+            )
+
+    def query_terms(self, query: str) -> List[int]:
+        seen: Dict[int, None] = {}
+        for tok in tokenize(query):
+            j = self._term_index.get(tok)
+            if j is not None:
+                seen[j] = None
+        return list(seen)
+
+    def scores(self, query: str, category: Optional[str] = None) -> Tuple[np.ndarray, List[int]]:
+        """Dense score vector over all docs (0 for non-matching / other categories) and matched term ids."""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        terms = self.query_terms(query)
+        for j in terms:
+            lo, hi = self.indptr[j], self.indptr[j + 1]
+            docs = self.postings_doc[lo:hi]
+            tf = self.postings_tf[lo:hi]
+            scores[docs] += self.idf[j] * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+        if category:
+            scores[self.doc_categories != category] = 0.0
+        return scores, terms
+
+    def search(self, query: str, k: int = 5, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        scores, _ = self.scores(query, category)
+        return self.top_k(scores, k)
+
+    def top_k(self, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [(str(self.doc_ids[i]), float(scores[i])) for i in idx]
+
+    def covers_all_terms(self, doc_id: str, terms: List[int]) -> bool:
+        """True if `doc_id` contains every matched query term."""
+        i = int(np.flatnonzero(self.doc_ids == doc_id)[0])
+        for j in terms:
+            lo, hi = self.indptr[j], self.indptr[j + 1]
+            if i not in self.postings_doc[lo:hi]:
+                return False
+        return True
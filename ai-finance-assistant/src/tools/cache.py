@@ -1,54 +1,642 @@
+import math
 import sqlite3
-import json
+import queue
+import threading
 import time
-from typing import Any, Optional, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 from pathlib import Path
 
+from ..config import settings
+from .serializers import Serializer, get_serializer
+
+# Stay well under SQLite's bound-parameter limit for IN (...) lists
+_MAX_IN_PARAMS = 500
+
+# Rows deleted per statement by the sweeper, so writers never wait long on it
+_SWEEP_BATCH = 500
+
+# Upper bound on keys with pending access stats between sweeps; past it, new
+# keys go unrecorded until the next flush (eviction order is approximate anyway)
+_ACCESS_MAX_KEYS = 50_000
+
+# How long a process trusts its copy of a namespace generation before re-reading it
+_GENERATION_REFRESH_SECONDS = 5.0
+
+# Applied to every pooled connection
+_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",   # safe with WAL, avoids an fsync per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",    # wait on writer locks instead of failing
+)
+
+def _shallow_copy(value: Any) -> Any:
+    # Callers tag payloads (cache_hit, stale); don't let that leak into the shared tier
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+class _MemoryTier:
+    """
+    Bounded in-process LRU (by entry count and approximate bytes) holding
+    decoded values with the same soft/hard expiry as their SQLite rows.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(int(max_entries), 0)
+        self.max_bytes = max(int(max_bytes), 0)
+        self.bytes = 0
+        self._data: "OrderedDict[str, Tuple[Any, int, int, Optional[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, now: int) -> Optional[Tuple[Any, bool]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at, stale_at = entry
+            if expires_at < now:
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+        return _shallow_copy(value), stale_at is not None and stale_at < now
+
+    def put(self, key: str, value: Any, size: int, expires_at: int, stale_at: Optional[int]) -> None:
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (value, size, expires_at, stale_at)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+
 class SQLiteTTLCache:
-    def __init__(self, db_path):
+    """
+    Key/value cache with two TTLs per entry:
+    - soft TTL (stale_at): after this the value is stale but still servable
+    - hard TTL (expires_at): after this the row is gone
+
+    Connections are pooled and reused across calls and threads; the DB runs in
+    WAL mode so readers don't block the writer. Use get_cache() to share one
+    instance per DB file across the process.
+
+    Reads go through a bounded in-process LRU first (memory_max_entries /
+    memory_max_bytes, 0 disables it). SQLite stays the shared, persistent
+    tier; a value another process rewrites can be served from memory until
+    its own TTL runs out.
+
+    A background sweeper (every sweep_interval_seconds, 0 disables it)
+    deletes expired rows in batches and, when the live data exceeds
+    max_db_bytes, evicts by eviction_policy ("lru" = oldest accessed_at,
+    "lfu" = fewest hits). Accesses are recorded in memory and flushed by the
+    sweeper, so reads never turn into writes; without a sweeper or a
+    max_db_bytes limit nothing reads them, so they aren't recorded.
+
+    Values are encoded by serializer ("json", "packed" or "packed+zlib", see
+    serializers.py). Packed values are stored as BLOBs; every serializer
+    still reads JSON rows, so switching formats needs no migration.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        pool_size: int = 8,
+        mmap_size: int = 64 * 1024 * 1024,
+        memory_max_entries: int = 1024,
+        memory_max_bytes: int = 8 * 1024 * 1024,
+        max_db_bytes: int = 0,
+        eviction_policy: str = "lru",
+        sweep_interval_seconds: float = 0,
+        serializer: Union[str, Serializer, None] = "json",
+    ):
+        if eviction_policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction_policy: {eviction_policy}")
         # Convert Path to string for sqlite3.connect
         self.db_path = str(db_path) if isinstance(db_path, Path) else db_path
+        self.mmap_size = int(mmap_size)
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max(int(pool_size), 1))
+        self._memory = _MemoryTier(memory_max_entries, memory_max_bytes)
+        self._serializer = get_serializer(serializer)
+        self._stats_lock = threading.Lock()
+        self._hits = {"memory": 0, "sqlite": 0, "miss": 0}
+        self.max_db_bytes = max(int(max_db_bytes), 0)
+        self.eviction_policy = eviction_policy
+        self._access_lock = threading.Lock()
+        self._access: Dict[str, Tuple[int, int]] = {}  # key -> (last access, hits since flush)
+        self._track_access = bool(self.max_db_bytes) or bool(sweep_interval_seconds and sweep_interval_seconds > 0)
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._generations: Dict[str, Tuple[int, float]] = {}  # namespace -> (generation, read at)
+        self._generations_lock = threading.Lock()
         self._init()
+        if sweep_interval_seconds and sweep_interval_seconds > 0:
+            self._start_sweeper(float(sweep_interval_seconds))
+
+    def _connect(self) -> sqlite3.Connection:
+        # cached_statements keeps our handful of queries prepared per connection
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=64)
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        return conn
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
 
     def _init(self) -> None:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn() as conn:
+            # WAL is persistent on the file; only needs setting once
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS cache (
                     key TEXT PRIMARY KEY,
                     value TEXT NOT NULL,
-                    expires_at INTEGER NOT NULL
+                    expires_at INTEGER NOT NULL,
+                    stale_at INTEGER
+                )
+                """
+            )
+            # Older DBs were created without these columns
+            cols = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            if "stale_at" not in cols:
+                conn.execute("ALTER TABLE cache ADD COLUMN stale_at INTEGER")
+            if "accessed_at" not in cols:
+                conn.execute("ALTER TABLE cache ADD COLUMN accessed_at INTEGER")
+            if "hits" not in cols:
+                conn.execute("ALTER TABLE cache ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed_at ON cache (accessed_at)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_namespaces (
+                    namespace TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL DEFAULT 0
                 )
                 """
             )
             conn.commit()
 
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Returns (value, is_stale). value is None on miss or after the hard TTL.
+        """
+        # Fast path for hot keys: no SQLite, no decoding
+        now = int(time.time())
+        hit = self._memory.get(key, now)
+        if hit is not None:
+            with self._stats_lock:
+                self._hits["memory"] += 1
+            self._touch([key], now)
+            return hit
+        return self.get_many_with_state([key]).get(key, (None, False))
+
     def get(self, key: str) -> Optional[Any]:
+        """
+        Fresh values only; stale entries are kept for get_with_state().
+        """
+        value, is_stale = self.get_with_state(key)
+        if is_stale:
+            return None
+        return value
+
+    def get_many_with_state(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, bool]]:
+        """
+        Bulk get_with_state(): one IN (...) query (chunked for very long key lists).
+        Returns {key: (value, is_stale)} for keys that are present and not hard-expired.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = int(time.time())
+        out: Dict[str, Tuple[Any, bool]] = {}
+
+        # Tier 1: in-process LRU
+        for key in keys:
+            hit = self._memory.get(key, now)
+            if hit is not None:
+                out[key] = hit
+        remaining = [k for k in keys if k not in out]
+        memory_hits = len(out)
+
+        # Tier 2: SQLite
+        rows: List[tuple] = []
+        with self._conn() as conn:
+            for i in range(0, len(remaining), _MAX_IN_PARAMS):
+                chunk = remaining[i:i + _MAX_IN_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(
+                    conn.execute(
+                        f"SELECT key, value, expires_at, stale_at FROM cache WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+
+        expired: List[str] = []
+        for key, raw, expires_at, stale_at in rows:
+            if expires_at < now:
+                expired.append(key)
+                continue
+            value = self._serializer.loads(raw)
+            self._memory.put(key, value, len(raw), expires_at, stale_at)
+            out[key] = (_shallow_copy(value), stale_at is not None and stale_at < now)
+
+        if expired:
+            self.delete_many(expired)
+
+        with self._stats_lock:
+            self._hits["memory"] += memory_hits
+            self._hits["sqlite"] += len(out) - memory_hits
+            self._hits["miss"] += len(keys) - len(out)
+        self._touch(out, now)
+        return out
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Bulk get(): {key: value} for fresh keys only.
+        """
+        return {k: v for k, (v, is_stale) in self.get_many_with_state(keys).items() if not is_stale}
+
+    def _row(self, key: str, value: Any, ttl_seconds: int, hard_ttl_seconds: Optional[int], now: int) -> tuple:
+        stale_at = now + ttl_seconds
+        expires_at = now + (ttl_seconds if hard_ttl_seconds is None else max(ttl_seconds, hard_ttl_seconds))
+        return (key, self._serializer.dumps(value), expires_at, stale_at)
+
+    def set(self, key: str, value: Any, ttl_seconds: int, hard_ttl_seconds: Optional[int] = None) -> None:
+        self.set_many({key: value}, ttl_seconds, hard_ttl_seconds)
+
+    def set_many(
+        self,
+        items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]],
+        ttl_seconds: int,
+        hard_ttl_seconds: Optional[int] = None,
+    ) -> None:
+        """
+        Bulk set(): all items written in a single transaction.
+        """
+        pairs = items.items() if isinstance(items, Mapping) else items
         now = int(time.time())
-        with sqlite3.connect(self.db_path) as conn:
+        rows = [self._row(k, v, ttl_seconds, hard_ttl_seconds, now) for k, v in pairs]
+        if not rows:
+            return
+        with self._conn() as conn:
+            # Upsert keeps the hit count across refreshes (LFU needs it)
+            conn.executemany(
+                """
+                INSERT INTO cache (key, value, expires_at, stale_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    expires_at = excluded.expires_at,
+                    stale_at = excluded.stale_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                [row + (now,) for row in rows],
+            )
+            conn.commit()
+        # Write-through; store a decoded copy so later caller mutations don't leak in
+        for key, raw, expires_at, stale_at in rows:
+            self._memory.put(key, self._serializer.loads(raw), len(raw), expires_at, stale_at)
+
+    def delete(self, key: str) -> None:
+        self._memory.discard(key)
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        for key in keys:
+            self._memory.discard(key)
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in keys])
+            conn.commit()
+
+    # ---------------------------
+    # Namespaces
+    # ---------------------------
+
+    def namespace(self, name: str, version: int = 1, stale_fallback: bool = True) -> "CacheNamespace":
+        """
+        View of this cache whose keys live under name/version/current generation.
+        """
+        return CacheNamespace(self, name, version, stale_fallback)
+
+    def generation(self, namespace: str) -> int:
+        """
+        Current generation of a namespace (shared through SQLite, re-read every few seconds).
+        """
+        now = time.monotonic()
+        with self._generations_lock:
+            cached = self._generations.get(namespace)
+            if cached is not None and now - cached[1] < _GENERATION_REFRESH_SECONDS:
+                return cached[0]
+        with self._conn() as conn:
             row = conn.execute(
-                "SELECT value, expires_at FROM cache WHERE key = ?",
-                (key,),
+                "SELECT generation FROM cache_namespaces WHERE namespace = ?",
+                (namespace,),
             ).fetchone()
-        if not row:
-            return None
-        value_str, expires_at = row
-        if expires_at < now:
-            self.delete(key)
-            return None
-        return json.loads(value_str)
+        gen = row[0] if row else 0
+        with self._generations_lock:
+            self._generations[namespace] = (gen, now)
+        return gen
 
-    def set(self, key: str, value: Any, ttl_seconds: int) -> None:
-        expires_at = int(time.time()) + ttl_seconds
-        value_str = json.dumps(value)
-        with sqlite3.connect(self.db_path) as conn:
+    def invalidate_namespace(self, namespace: str) -> int:
+        """
+        O(1) invalidation: bumps the namespace generation so every existing key
+        becomes unreachable (old rows age out via expiry/eviction). Other
+        processes pick the bump up within a few seconds. Returns the new generation.
+        """
+        with self._conn() as conn:
             conn.execute(
-                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
-                (key, value_str, expires_at),
+                """
+                INSERT INTO cache_namespaces (namespace, generation) VALUES (?, 1)
+                ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1
+                """,
+                (namespace,),
+            )
+            conn.commit()
+            gen = conn.execute(
+                "SELECT generation FROM cache_namespaces WHERE namespace = ?",
+                (namespace,),
+            ).fetchone()[0]
+        with self._generations_lock:
+            self._generations[namespace] = (gen, time.monotonic())
+        return gen
+
+    # ---------------------------
+    # Access tracking / sweeping
+    # ---------------------------
+
+    def _touch(self, keys: Iterable[str], now: int) -> None:
+        if not self._track_access:
+            return
+        with self._access_lock:
+            for key in keys:
+                prev = self._access.get(key)
+                if prev is None and len(self._access) >= _ACCESS_MAX_KEYS:
+                    continue
+                self._access[key] = (now, (prev[1] if prev else 0) + 1)
+
+    def _flush_access(self, conn: sqlite3.Connection) -> int:
+        with self._access_lock:
+            pending, self._access = self._access, {}
+        if pending:
+            conn.executemany(
+                "UPDATE cache SET accessed_at = MAX(COALESCE(accessed_at, 0), ?), hits = hits + ? WHERE key = ?",
+                [(ts, count, key) for key, (ts, count) in pending.items()],
             )
             conn.commit()
+        return len(pending)
+
+    def db_bytes(self) -> int:
+        """
+        Bytes in use by live pages. Freed pages stay in the file and get reused,
+        so this is what bounds the file size.
+        """
+        with self._conn() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free) * page_size
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        One sweeper pass: flush access stats, delete expired rows in batches,
+        then evict (LRU/LFU) as many rows as it takes to get under max_db_bytes.
+        """
+        now = int(time.time())
+        expired = 0
+        evicted = 0
+        # Eviction is planned from the size and row count before anything is deleted:
+        # the live page count lags behind deletes (a page only frees once it is empty)
+        used = self.db_bytes() if self.max_db_bytes else 0
+
+        with self._conn() as conn:
+            self._flush_access(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] if used else 0
+            while True:
+                cur = conn.execute(
+                    "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE expires_at < ? LIMIT ?)",
+                    (now, _SWEEP_BATCH),
+                )
+                conn.commit()
+                expired += cur.rowcount
+                if cur.rowcount < _SWEEP_BATCH or self._stop.is_set():
+                    break
+
+        if used > self.max_db_bytes and rows and not self._stop.is_set():
+            # Rows over budget at the average row size; expired rows already count toward it
+            excess = math.ceil((used - self.max_db_bytes) * rows / used) - expired
+            if excess > 0:
+                evicted = self._evict(excess)
+
+        # Keep the WAL file from growing between automatic checkpoints
+        with self._conn() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        return {"expired_deleted": expired, "evicted": evicted, "db_bytes": self.db_bytes()}
+
+    def _evict(self, n: int) -> int:
+        """Deletes the n least recently (lru) / least often (lfu) used rows in one bounded statement."""
+        order = "accessed_at" if self.eviction_policy == "lru" else "hits, accessed_at"
+        with self._conn() as conn:
+            victims = f"SELECT rowid FROM cache ORDER BY {order} LIMIT {int(n)}"
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [row[0] for row in conn.execute(f"SELECT key FROM cache WHERE rowid IN ({victims})")]
+            evicted = conn.execute(f"DELETE FROM cache WHERE rowid IN ({victims})").rowcount
+            conn.commit()
+        for key in keys:
+            self._memory.discard(key)
+        return evicted
+
+    def _start_sweeper(self, interval: float) -> None:
+        def _loop() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception:
+                    # Sweeping is best-effort; the next pass retries
+                    pass
+
+        self._sweeper = threading.Thread(target=_loop, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit-rate breakdown per tier (counted per key lookup).
+        """
+        with self._stats_lock:
+            hits = dict(self._hits)
+        total = sum(hits.values())
+        return {
+            "lookups": total,
+            "memory_hits": hits["memory"],
+            "sqlite_hits": hits["sqlite"],
+            "misses": hits["miss"],
+            "memory_hit_rate": hits["memory"] / total if total else 0.0,
+            "sqlite_hit_rate": hits["sqlite"] / total if total else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory.bytes,
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class CacheNamespace:
+    """
+    Namespaced, versioned key space on top of a SQLiteTTLCache.
+    Physical keys look like "<name>:v<version>:g<generation>:<key>":
+    - bump version when the payload schema changes (old rows are never read)
+    - call invalidate() (generation bump) to drop the whole family in O(1)
+
+    With stale_fallback, a key missing from the current generation is looked
+    up in the previous one and returned as stale, so callers that
+    revalidate stale values (fetch_quotes) refresh in the background instead
+    of stampeding the provider after an invalidation.
+    """
+
+    def __init__(self, cache: SQLiteTTLCache, name: str, version: int = 1, stale_fallback: bool = True):
+        if ":" in name:
+            raise ValueError("Namespace names cannot contain ':'")
+        self.cache = cache
+        self.name = name
+        self.version = int(version)
+        self.stale_fallback = stale_fallback
+
+    def _prefix(self, generation: int) -> str:
+        return f"{self.name}:v{self.version}:g{generation}:"
+
+    def key(self, key: str) -> str:
+        return self._prefix(self.cache.generation(self.name)) + key
+
+    def get_many_with_state(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, bool]]:
+        keys = list(dict.fromkeys(keys))
+        gen = self.cache.generation(self.name)
+        prefix = self._prefix(gen)
+        found = self.cache.get_many_with_state(prefix + k for k in keys)
+        out = {k: found[prefix + k] for k in keys if prefix + k in found}
+
+        missing = [k for k in keys if k not in out]
+        if missing and self.stale_fallback and gen > 0:
+            prev = self._prefix(gen - 1)
+            for k, (value, _) in self.cache.get_many_with_state(prev + m for m in missing).items():
+                out[k[len(prev):]] = (value, True)
+        return out
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        # Fresh values only, so previous-generation fallbacks never show up here
+        return {k: v for k, (v, is_stale) in self.get_many_with_state(keys).items() if not is_stale}
+
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        return self.get_many_with_state([key]).get(key, (None, False))
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(
+        self,
+        items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]],
+        ttl_seconds: int,
+        hard_ttl_seconds: Optional[int] = None,
+    ) -> None:
+        prefix = self._prefix(self.cache.generation(self.name))
+        pairs = items.items() if isinstance(items, Mapping) else items
+        self.cache.set_many([(prefix + k, v) for k, v in pairs], ttl_seconds, hard_ttl_seconds)
+
+    def set(self, key: str, value: Any, ttl_seconds: int, hard_ttl_seconds: Optional[int] = None) -> None:
+        self.set_many({key: value}, ttl_seconds, hard_ttl_seconds)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        prefix = self._prefix(self.cache.generation(self.name))
+        self.cache.delete_many(prefix + k for k in keys)
 
     def delete(self, key: str) -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
-            conn.commit()
\ No newline at end of file
+        self.delete_many([key])
+
+    def invalidate(self) -> int:
+        return self.cache.invalidate_namespace(self.name)
+
+
+_CACHES: Dict[str, SQLiteTTLCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_cache(db_path, **kwargs) -> SQLiteTTLCache:
+    """
+    Process-wide SQLiteTTLCache per DB file, so the schema check runs once and
+    pooled connections (and the memory tier) are shared across sessions.
+    kwargs are only used when the instance is first created.
+    """
+    key = str(Path(db_path).resolve())
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = SQLiteTTLCache(db_path, **kwargs)
+            _CACHES[key] = cache
+        return cache
+
+
+def get_app_cache() -> SQLiteTTLCache:
+    """The app-wide cache at CACHE_DB_PATH, configured from Settings."""
+    return get_cache(
+        settings.cache_db_path,
+        memory_max_entries=settings.cache_memory_max_entries,
+        memory_max_bytes=settings.cache_memory_max_bytes,
+        max_db_bytes=settings.cache_max_db_bytes,
+        eviction_policy=settings.cache_eviction_policy,
+        sweep_interval_seconds=settings.cache_sweep_interval_seconds,
+        serializer=settings.cache_serializer,
+    )
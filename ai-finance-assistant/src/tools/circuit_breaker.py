@@ -0,0 +1,77 @@
+# src/tools/circuit_breaker.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider while its breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Provider-level circuit breaker.
+    - closed: calls go through; N consecutive failures open the breaker
+    - open: calls are rejected immediately for reset_seconds
+    - half_open: one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.reset_seconds = float(reset_seconds)
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = "half_open"
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError("Quote provider temporarily unavailable (circuit open).")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        # Call finished without saying anything about provider health: free the
+        # half-open trial slot but leave state and failure count alone
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._current_state(), "consecutive_failures": self._failures}
@@ -0,0 +1,364 @@
+# src/tools/docstore.py
+from __future__ import annotations
+
+import json
+import mmap
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_DIRNAME = "docstore"
+
+# Rewrite the text blob once more than half of it belongs to deleted chunks
+_COMPACT_MIN_DEAD_BYTES = 1 << 20
+
+_SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+
+
+def db_name(generation: int) -> str:
+    # Generation 0 is the layout from before generations (a single docs.db)
+    return f"docs-{generation}.db" if generation else "docs.db"
+
+
+def blob_name(generation: int) -> str:
+    return f"texts-g{generation}.bin"
+
+
+def _db_generation(name: str) -> int:
+    return int(name[len("docs-"):-len(".db")]) if name.startswith("docs-") else 0
+
+
+class MmapDocstore(Docstore, AddableMixin):
+    """
+    Pickle-free docstore for the FAISS index:
+    - chunk texts are appended to a UTF-8 blob that is read through mmap,
+      so every process shares it via the page cache and nothing is loaded up front
+    - offsets, lengths and metadata live in SQLite (docs-<generation>.db)
+    - the FAISS position -> doc id table lives there too (see PositionMap)
+
+    Every saved index is a new generation: a refresh edits a fork() of the
+    current db and only ever appends to the blob (compaction writes a new
+    one), so a published generation never changes under the processes
+    reading it. Readers open it with writable=False.
+    """
+
+    def __init__(self, root: Path, generation: int = 0, writable: bool = True):
+        self.root = Path(root)
+        self.generation = int(generation)
+        self._lock = threading.RLock()
+        path = self.root / db_name(self.generation)
+        if not writable and self.generation:
+            # Published generations are immutable: no locks, no WAL/SHM files
+            self._db = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        else:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level="DEFERRED")
+            if self.generation:
+                # Rollback journal, not WAL: once committed the db file alone is the whole generation
+                self._db.execute("PRAGMA journal_mode=DELETE;")
+            self._db.execute("PRAGMA synchronous=NORMAL;")
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_id TEXT PRIMARY KEY,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    category TEXT,
+                    metadata TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS positions (
+                    pos INTEGER PRIMARY KEY,
+                    doc_id TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                """
+            )
+            self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('blob', ?)", (blob_name(self.generation),))
+            self._db.commit()
+        self._blob_name = self._meta("blob")
+        self._mm: Optional[mmap.mmap] = None
+        self._mm_size = 0
+        # Map now: an older generation's blob may be pruned later, the open mapping survives that
+        self._remap()
+
+    def fork(self, generation: int) -> "MmapDocstore":
+        """Writable copy of this generation's tables as `generation`, sharing the blob."""
+        path = self.root / db_name(generation)
+        _unlink_db(path)  # left behind by a refresh that died
+        dst = sqlite3.connect(str(path))
+        with self._lock:
+            self._db.backup(dst)
+        dst.close()
+        return MmapDocstore(self.root, generation)
+
+    # ---- blob access ----
+    def _meta(self, key: str) -> str:
+        return self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+    @property
+    def blob_path(self) -> Path:
+        return self.root / self._blob_name
+
+    def _read(self, offset: int, length: int) -> str:
+        end = offset + length
+        if self._mm is None or end > self._mm_size:
+            self._remap()
+        return self._mm[offset:end].decode("utf-8")
+
+    def _remap(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        path = self.blob_path
+        size = path.stat().st_size if path.exists() else 0
+        self._mm_size = size
+        if size:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # ---- Docstore interface ----
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT offset, length, metadata FROM docs WHERE doc_id = ?", (search,)
+            ).fetchone()
+            if row is None:
+                return f"ID {search} not found."
+            offset, length, metadata = row
+            text = self._read(offset, length) if length else ""
+        return Document(page_content=text, metadata=json.loads(metadata))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        with self._lock:
+            overlap = [k for k in texts if self._db.execute("SELECT 1 FROM docs WHERE doc_id = ?", (k,)).fetchone()]
+            if overlap:
+                raise ValueError(f"Tried to add ids that already exist: {overlap}")
+            rows = []
+            with open(self.blob_path, "ab") as f:
+                offset = f.tell()
+                for doc_id, doc in texts.items():
+                    raw = (doc.page_content or "").encode("utf-8")
+                    f.write(raw)
+                    meta = doc.metadata or {}
+                    rows.append((doc_id, offset, len(raw), meta.get("category"), json.dumps(meta)))
+                    offset += len(raw)
+            self._db.executemany(
+                "INSERT INTO docs (doc_id, offset, length, category, metadata) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def delete(self, ids: List) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM docs WHERE doc_id = ?", [(i,) for i in ids])
+
+    # ---- bulk helpers ----
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0])
+
+    def iter_documents(self, categories: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Document]]:
+        """(doc_id, Document) in FAISS position order, optionally only chunks of `categories`."""
+        where, params = "", []
+        if categories is not None:
+            params = list(categories)
+            where = f" WHERE COALESCE(d.category, 'Uncategorized') IN ({','.join('?' * len(params))})"
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.doc_id, d.offset, d.length, d.metadata FROM positions p "
+                "JOIN docs d ON d.doc_id = p.doc_id" + where + " ORDER BY p.pos",
+                params,
+            ).fetchall()
+        for doc_id, offset, length, metadata in rows:
+            with self._lock:
+                text = self._read(offset, length) if length else ""
+            yield doc_id, Document(page_content=text, metadata=json.loads(metadata))
+
+    def indexed_chunks(self) -> List[Tuple[int, str, Optional[str]]]:
+        """(position, doc_id, category) for every indexed chunk, without touching the text blob."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT p.pos, d.doc_id, d.category FROM positions p JOIN docs d ON d.doc_id = p.doc_id ORDER BY p.pos"
+            ).fetchall()
+
+    def live_bytes(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COALESCE(SUM(length), 0) FROM docs").fetchone()[0])
+
+    def flush(self, index_to_docstore_id: Mapping[int, str]) -> None:
+        """Persist the position table and commit; compacts the blob when it is mostly garbage."""
+        with self._lock:
+            if not isinstance(index_to_docstore_id, PositionMap) or index_to_docstore_id.store is not self:
+                self._db.execute("DELETE FROM positions")
+                self._db.executemany(
+                    "INSERT INTO positions (pos, doc_id) VALUES (?, ?)",
+                    sorted((int(p), i) for p, i in index_to_docstore_id.items()),
+                )
+            blob_size = self.blob_path.stat().st_size if self.blob_path.exists() else 0
+            dead = blob_size - self.live_bytes()
+            if dead > _COMPACT_MIN_DEAD_BYTES and dead > blob_size // 2:
+                self._compact()
+            self.commit()
+
+    def _compact(self) -> None:
+        # Live texts are copied to this generation's own blob; older generations keep reading theirs
+        new_name = blob_name(self.generation)
+        if new_name == self._blob_name:
+            return
+        rows = self._db.execute("SELECT doc_id, offset, length FROM docs ORDER BY offset").fetchall()
+        updates = []
+        with open(self.root / new_name, "wb") as out:
+            for doc_id, offset, length in rows:
+                updates.append((out.tell(), doc_id))
+                out.write(self._mm_bytes(offset, length))
+        self._db.executemany("UPDATE docs SET offset = ? WHERE doc_id = ?", updates)
+        self._db.execute("UPDATE meta SET value = ? WHERE key = 'blob'", (new_name,))
+        self._blob_name = new_name
+        self._remap()
+
+    def _mm_bytes(self, offset: int, length: int) -> bytes:
+        if self._mm is None or offset + length > self._mm_size:
+            self._remap()
+        return bytes(self._mm[offset:offset + length]) if length else b""
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._db.close()
+
+
+class PositionMap(MutableMapping):
+    """FAISS position -> doc id, read lazily from the docstore's (per-generation, so stable) SQLite file."""
+
+    def __init__(self, store: MmapDocstore):
+        self.store = store
+
+    def __getitem__(self, pos: int) -> str:
+        with self.store._lock:
+            row = self.store._db.execute("SELECT doc_id FROM positions WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __setitem__(self, pos: int, doc_id: str) -> None:
+        with self.store._lock:
+            self.store._db.execute("INSERT OR REPLACE INTO positions (pos, doc_id) VALUES (?, ?)", (int(pos), doc_id))
+
+    def __delitem__(self, pos: int) -> None:
+        with self.store._lock:
+            self.store._db.execute("DELETE FROM positions WHERE pos = ?", (int(pos),))
+
+    def __iter__(self) -> Iterator[int]:
+        with self.store._lock:
+            rows = self.store._db.execute("SELECT pos FROM positions ORDER BY pos").fetchall()
+        return iter(r[0] for r in rows)
+
+    def __len__(self) -> int:
+        with self.store._lock:
+            return int(self.store._db.execute("SELECT COUNT(*) FROM positions").fetchone()[0])
+
+    def items(self) -> List[Tuple[int, str]]:
+        # One query instead of a lookup per key (FAISS.delete walks the whole map)
+        with self.store._lock:
+            return self.store._db.execute("SELECT pos, doc_id FROM positions ORDER BY pos").fetchall()
+
+    def values(self) -> List[str]:
+        return [doc_id for _, doc_id in self.items()]
+
+
+def docstore_dir(index_dir: Path) -> Path:
+    return Path(index_dir) / DOCSTORE_DIRNAME
+
+
+def docstore_exists(index_dir: Path, generation: int = 0) -> bool:
+    return (docstore_dir(index_dir) / db_name(generation)).exists()
+
+
+def _unlink_db(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    for suffix in _SQLITE_SIDECARS:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def fresh_docstore(root: Path, generation: int) -> MmapDocstore:
+    """Empty docstore for `generation`, discarding whatever an interrupted build left for it."""
+    root = Path(root)
+    _unlink_db(root / db_name(generation))
+    (root / blob_name(generation)).unlink(missing_ok=True)
+    return MmapDocstore(root, generation)
+
+
+def write_docstore(
+    root: Path, generation: int, documents: Iterator[Tuple[str, Document]], batch_size: int = 1000
+) -> MmapDocstore:
+    """Writes generation `generation` at `root` from (doc_id, Document) pairs in position order."""
+    store = fresh_docstore(root, generation)
+    positions: Dict[int, str] = {}
+    batch: Dict[str, Document] = {}
+    for pos, (doc_id, doc) in enumerate(documents):
+        batch[doc_id] = doc
+        positions[pos] = doc_id
+        if len(batch) >= batch_size:
+            store.add(batch)
+            batch = {}
+    if batch:
+        store.add(batch)
+    store.flush(positions)
+    return store
+
+
+def prune_generations(root: Path, keep: Iterable[int]) -> None:
+    """
+    Deletes generations older than the newest in `keep` (except those in
+    `keep`) and every blob none of the kept generations points at. Processes
+    still reading a pruned generation keep their open files.
+    """
+    root, keep = Path(root), set(keep)
+    newest = max(keep)
+    blobs = set()
+    for path in root.glob("docs*.db"):
+        generation = _db_generation(path.name)
+        if generation in keep:
+            db = sqlite3.connect(str(path))
+            try:
+                blobs.add(db.execute("SELECT value FROM meta WHERE key = 'blob'").fetchone()[0])
+            finally:
+                db.close()
+        elif generation < newest:
+            _unlink_db(path)
+    for path in root.glob("texts-*.bin"):
+        if path.name not in blobs:
+            path.unlink()
+
+
+def import_pickle_docstore(index_dir: Path, pkl_name: str = "index.pkl") -> MmapDocstore:
+    """
+    One-off migration of a LangChain index.pkl (InMemoryDocstore + id map) into
+    the mmap docstore. Unpickles the file, so only run it on indexes you built.
+    """
+    index_dir = Path(index_dir)
+    with open(index_dir / pkl_name, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)  # trusted: our own build artifact
+
+    def _documents() -> Iterator[Tuple[str, Document]]:
+        for pos in sorted(index_to_docstore_id):
+            doc_id = index_to_docstore_id[pos]
+            doc = docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                # Positions must stay aligned with index.faiss, so a hole can't just be skipped
+                raise ValueError(f"{pkl_name}: position {pos} points at missing doc {doc_id!r}")
+            yield doc_id, doc
+
+    return write_docstore(docstore_dir(index_dir), 0, _documents())
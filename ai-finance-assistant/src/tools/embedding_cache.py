@@ -0,0 +1,155 @@
+# src/tools/embedding_cache.py
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_MAX_IN_PARAMS = 500
+
+
+def embedding_model_name(embeddings) -> str:
+    return str(getattr(embeddings, "model", None) or type(embeddings).__name__)
+
+
+def embedding_key(model: str, text: str) -> bytes:
+    """Content address of one embedding: sha256(model + NUL + text)."""
+    h = hashlib.sha256(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of float32 vectors in SQLite.
+    Vectors are kept as raw little-endian float32 bytes (4 bytes/dim, no JSON).
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("PRAGMA synchronous=NORMAL;")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._db.commit()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        uniq = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(uniq), _MAX_IN_PARAMS):
+                part = uniq[i:i + _MAX_IN_PARAMS]
+                marks = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, vec in rows:
+                    found[bytes(key)] = np.frombuffer(vec, dtype="<f4")
+        return found
+
+    def set_many(self, items: Dict[bytes, Sequence[float]]) -> None:
+        if not items:
+            return
+        rows = []
+        for key, vec in items.items():
+            arr = np.asarray(vec, dtype="<f4")
+            rows.append((key, int(arr.shape[0]), arr.tobytes()))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec) VALUES (?, ?, ?)", rows
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain Embeddings: document embeddings are looked up by
+    content hash first and only the misses are sent to the backend.
+    """
+
+    def __init__(self, backend: Embeddings, cache: EmbeddingCache, batch_size: int = 256):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        self.model = embedding_model_name(backend)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def embed_documents(
+        self, texts: List[str], embed_misses: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ) -> List[List[float]]:
+        """`embed_misses` replaces backend.embed_documents for the misses (e.g. to run it in a worker process)."""
+        keys = [embedding_key(self.model, t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        todo: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in todo:
+                todo[key] = text
+        missed = sum(1 for k in keys if k in todo)
+        with self._stats_lock:
+            self.hits += len(texts) - missed
+            self.misses += missed
+
+        pending = list(todo.items())
+        for i in range(0, len(pending), self.batch_size):
+            part = pending[i:i + self.batch_size]
+            vectors = (embed_misses or self.backend.embed_documents)([t for _, t in part])
+            fresh = {key: vec for (key, _), vec in zip(part, vectors)}
+            self.cache.set_many(fresh)
+            for key, vec in fresh.items():
+                found[key] = np.asarray(vec, dtype="<f4")
+
+        return [found[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.backend.embed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(db_path: Path) -> EmbeddingCache:
+    """One EmbeddingCache per db file per process."""
+    key = str(Path(db_path).resolve())
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = EmbeddingCache(db_path)
+            _CACHES[key] = cache
+        return cache
+
+
+def with_embedding_cache(backend: Embeddings, db_path: Optional[Path]) -> Embeddings:
+    if db_path is None:
+        return backend
+    return CachedEmbeddings(backend, get_embedding_cache(db_path))
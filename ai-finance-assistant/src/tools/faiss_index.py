@@ -0,0 +1,242 @@
+# src/tools/faiss_index.py
+from __future__ import annotations
+
+import json
+import math
+import os
+import warnings
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import faiss
+import numpy as np
+
+
+def mmap_flags() -> int:
+    """
+    Read-only, memory-mapped load: codes, inverted lists and HNSW links stay in
+    the page cache and are shared by every process that maps the same file.
+    IO_FLAG_MMAP_IFC (faiss >= 1.11) covers flat, IVF and HNSW indexes. It
+    can't be combined with the older IO_FLAG_MMAP, which breaks IVF loads.
+    Returns 0 (eager load) when this faiss build has no IO_FLAG_MMAP_IFC.
+    """
+    ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if ifc is None:
+        # IO_FLAG_MMAP alone only maps IVF lists and would load Flat indexes eagerly anyway
+        warnings.warn(
+            f"FAISS_MMAP needs faiss >= 1.11 (IO_FLAG_MMAP_IFC); faiss {faiss.__version__} loads indexes eagerly.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return 0
+    return ifc | faiss.IO_FLAG_READ_ONLY
+
+
+def read_index(path: Path, mmap: bool = False):
+    """Eager (private heap copy, writable) or mmap (shared pages, read-only) load."""
+    return faiss.read_index(str(path), mmap_flags() if mmap else 0)
+
+
+def write_index(index, path: Path) -> None:
+    """Atomic write: a reader never maps a half-written index file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, path)
+
+
+# Below this many vectors exact search is already sub-millisecond and IVF/PQ can't be trained well
+MIN_ANN_VECTORS = 10_000
+
+INDEX_TYPES = ("flat", "hnsw", "hnswsq", "ivf", "ivfsq", "ivfpq")
+
+
+def _auto_nlist(n: int) -> int:
+    return int(max(16, min(4 * math.sqrt(n), n // 39)))
+
+
+def _auto_pq_m(dim: int) -> int:
+    # ~16 dims per 8-bit sub-quantizer, m must divide dim
+    target = max(1, dim // 16)
+    return max(m for m in range(1, target + 1) if dim % m == 0)
+
+
+def factory_string(index_type: str, dim: int, n: int, nlist: int = 0, pq_m: int = 0, hnsw_m: int = 32) -> str:
+    index_type = index_type.lower()
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "hnswsq":
+        return f"HNSW{hnsw_m}_SQ8"
+    nlist = nlist or _auto_nlist(n)
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivfsq":
+        return f"IVF{nlist},SQ8"
+    if index_type == "ivfpq":
+        return f"IVF{nlist},PQ{pq_m or _auto_pq_m(dim)}"
+    raise ValueError(f"Unknown FAISS_INDEX_TYPE: {index_type!r} (expected one of {', '.join(INDEX_TYPES)})")
+
+
+class StreamingIndexBuilder:
+    """
+    Builds an index of the requested type from vectors that arrive in batches.
+    Only the first `buffer_size` vectors are held back (enough to decide on the
+    small-corpus Flat fallback and to train IVF/PQ); everything after that is
+    added straight to the index, so memory doesn't grow with the corpus.
+    """
+
+    def __init__(
+        self,
+        index_type: str = "flat",
+        nlist: int = 0,
+        pq_m: int = 0,
+        hnsw_m: int = 32,
+        train_sample: int = 50_000,
+        expected_total: int = 0,
+        seed: int = 0,
+    ):
+        self.requested = index_type.lower()
+        factory_string(self.requested, 8, MIN_ANN_VECTORS)  # validate the type early
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.train_sample = train_sample
+        self.expected_total = expected_total
+        self.seed = seed
+        self.index = None
+        self.meta: Dict[str, Any] = {}
+        self._buffer: list = []
+        self._buffered = 0
+        needs_training = self.requested.startswith("ivf") or self.requested.endswith("sq")
+        if self.requested == "flat":
+            self.buffer_size = 0
+        elif needs_training:
+            self.buffer_size = max(MIN_ANN_VECTORS, train_sample)
+        else:
+            self.buffer_size = MIN_ANN_VECTORS
+
+    @property
+    def ntotal(self) -> int:
+        return (self.index.ntotal if self.index is not None else 0) + self._buffered
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.index is not None:
+            self.index.add(vectors)
+            return
+        self._buffer.append(vectors)
+        self._buffered += len(vectors)
+        if self._buffered >= self.buffer_size:
+            self._create(final=False)
+
+    def _create(self, final: bool) -> None:
+        pending = np.concatenate(self._buffer) if self._buffer else np.zeros((0, 0), dtype=np.float32)
+        self._buffer, self._buffered = [], 0
+        n, dim = pending.shape
+        # Ended before reaching the ANN threshold -> exact Flat is both faster and better here
+        built = "flat" if (final and n < MIN_ANN_VECTORS) else self.requested
+        factory = factory_string(built, dim, max(n, self.expected_total), self.nlist, self.pq_m, self.hnsw_m)
+        index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+        trained_on = 0
+        if not index.is_trained:
+            sample = pending
+            if n > self.train_sample:
+                rng = np.random.default_rng(self.seed)
+                sample = pending[np.sort(rng.choice(n, self.train_sample, replace=False))]
+            index.train(sample)
+            trained_on = len(sample)
+        index.add(pending)
+        self.index = index
+        self.meta = {
+            "type": built,
+            "requested_type": self.requested,
+            "factory": factory,
+            "dim": dim,
+            "metric": "l2",
+            "trained_on": trained_on,
+        }
+
+    def finish(self) -> Tuple[Any, Dict[str, Any]]:
+        if self.index is None:
+            if not self._buffer:
+                raise ValueError("No vectors were added to the index")
+            self._create(final=True)
+        meta = dict(self.meta, ntotal=int(self.index.ntotal))
+        return self.index, meta
+
+
+def build_ann_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    nlist: int = 0,
+    pq_m: int = 0,
+    hnsw_m: int = 32,
+    train_sample: int = 50_000,
+    seed: int = 0,
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Builds (trains on a random sample, then fills) an L2 index of the requested
+    type. Falls back to Flat for small corpora. Returns the index and the
+    metadata describing what was actually built.
+    """
+    builder = StreamingIndexBuilder(index_type, nlist, pq_m, hnsw_m, train_sample, expected_total=len(vectors), seed=seed)
+    builder.add(vectors)
+    return builder.finish()
+
+
+def supports_remove(index) -> bool:
+    """Only flat indexes renumber positions after remove_ids, which the LangChain id map relies on."""
+    return isinstance(index, faiss.IndexFlat)
+
+
+def stores_exact_vectors(index) -> bool:
+    """Flat and HNSW-flat keep the raw vectors, so reconstruct() gives back exactly what was added."""
+    if isinstance(index, faiss.IndexFlat):
+        return True
+    return hasattr(index, "storage") and isinstance(faiss.downcast_index(index.storage), faiss.IndexFlat)
+
+
+def apply_search_params(index, nprobe: int = 16, ef_search: int = 64) -> None:
+    """Recall/speed knobs; harmless no-ops for index types that don't have them."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = max(1, min(nprobe, ivf.nlist))
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = max(1, ef_search)
+
+
+def describe_index(index) -> Dict[str, Any]:
+    """Best-effort metadata for an index that predates index_meta.json."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if isinstance(index, faiss.IndexFlat):
+        kind = "flat"
+    elif hasattr(index, "hnsw"):
+        kind = "hnswsq" if isinstance(index, faiss.IndexHNSWSQ) else "hnsw"
+    elif ivf is not None:
+        # try_extract_index_ivf hands back the IndexIVF base class; downcast to see SQ/PQ
+        ivf = faiss.downcast_index(ivf)
+        kind = {"IndexIVFFlat": "ivf", "IndexIVFScalarQuantizer": "ivfsq", "IndexIVFPQ": "ivfpq"}.get(type(ivf).__name__, "ivf")
+    else:
+        kind = type(index).__name__
+    return {"type": kind, "dim": int(index.d), "metric": "l2", "ntotal": int(index.ntotal)}
+
+
+def index_path(index_dir: Path, generation: int = 0) -> Path:
+    # Generation 0 is the layout from before generations (a single index.faiss)
+    return Path(index_dir) / (f"index-{generation}.faiss" if generation else "index.faiss")
+
+
+def read_index_meta(index_dir: Path) -> Dict[str, Any]:
+    path = Path(index_dir) / "index_meta.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_index_meta(index_dir: Path, meta: Dict[str, Any]) -> None:
+    path = Path(index_dir) / "index_meta.json"
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
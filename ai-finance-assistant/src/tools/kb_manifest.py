@@ -0,0 +1,122 @@
+# src/tools/kb_manifest.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of the raw file bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id(filename: str, digest: str, i: int) -> str:
+    # Stable per (file, content): a changed file gets fresh ids, unchanged files keep theirs
+    return f"{filename}:{digest[:12]}:{i:04d}"
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    path = Path(path)
+    if not path.exists():
+        return {"version": "1.0", "sources": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    """Atomic write so a crashed build never leaves a half-written manifest behind."""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=False) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def index_state(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """The `index` block describing what is currently embedded (empty for legacy manifests)."""
+    return manifest.get("index") or {}
+
+
+@dataclass
+class KBDiff:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    digests: Dict[str, str] = field(default_factory=dict)  # current file -> sha256
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "unchanged": len(self.unchanged),
+        }
+
+
+def diff_kb(kb_dir: Path, state: Dict[str, Any], pattern: str = "*.txt") -> KBDiff:
+    """Compare the files on disk against the per-file hashes recorded in the manifest."""
+    kb_dir = Path(kb_dir)
+    if not kb_dir.exists():
+        raise FileNotFoundError(f"KB_DIR not found: {kb_dir}")
+
+    known: Dict[str, Any] = state.get("files") or {}
+    diff = KBDiff()
+    for path in sorted(kb_dir.glob(pattern)):
+        digest = file_digest(path)
+        diff.digests[path.name] = digest
+        entry = known.get(path.name)
+        if entry is None:
+            diff.added.append(path.name)
+        elif entry.get("sha256") != digest:
+            diff.changed.append(path.name)
+        else:
+            diff.unchanged.append(path.name)
+    diff.removed = sorted(set(known) - set(diff.digests))
+    return diff
+
+
+def stale_chunk_ids(state: Dict[str, Any], diff: KBDiff) -> List[str]:
+    """Vector ids that must be deleted before re-adding changed files."""
+    files = state.get("files") or {}
+    ids: List[str] = []
+    for name in diff.changed + diff.removed:
+        ids.extend(files.get(name, {}).get("chunk_ids", []))
+    return ids
+
+
+def next_index_state(
+    state: Dict[str, Any],
+    diff: KBDiff,
+    new_chunks: Dict[str, List[str]],
+    params: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Index block after applying `diff`; bumps the index version whenever content changed."""
+    files = dict(state.get("files") or {})
+    for name in diff.removed:
+        files.pop(name, None)
+    for name, ids in new_chunks.items():
+        files[name] = {"sha256": diff.digests[name], "chunk_ids": ids}
+
+    version = int(state.get("version", 0))
+    if not diff.is_empty or state.get("params") != params:
+        version += 1
+    return {
+        "version": version,
+        "updated_at": int(time.time()),
+        "params": params,
+        "num_files": len(files),
+        "num_chunks": sum(len(f["chunk_ids"]) for f in files.values()),
+        "files": dict(sorted(files.items())),
+    }
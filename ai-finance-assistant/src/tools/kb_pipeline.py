@@ -0,0 +1,190 @@
+# src/tools/kb_pipeline.py
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from .docstore import MmapDocstore, PositionMap, fresh_docstore
+from .embedding_cache import CachedEmbeddings
+from .faiss_index import StreamingIndexBuilder
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# (path, sha256) in, (file name, chunks) out; must be a module-level function so the pool can pickle it
+ChunkFn = Callable[[Tuple[str, str]], Tuple[str, List[Document]]]
+Sink = Callable[[List[Document], np.ndarray], None]
+
+
+def bounded_map(executor: Executor, fn: Callable[[T], R], items: Iterable[T], max_pending: int) -> Iterator[R]:
+    """
+    executor.map that submits lazily: at most `max_pending` tasks (and their
+    results) exist at once, and results come back in input order.
+    """
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class PipelineStats:
+    files: int = 0
+    chunks: int = 0
+    vectors: int = 0  # embedded and added to the index
+    batches: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def rate(self, count: int) -> float:
+        return count / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "vectors": self.vectors,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "chunks_per_second": round(self.rate(self.chunks), 1),
+            "embeddings_per_second": round(self.rate(self.vectors), 1),
+        }
+
+
+class KBBuildPipeline:
+    """
+    Streaming KB build:
+      files -> parse + chunk (in-process, or a process pool with workers > 1) -> fixed-size batches
+            -> embed (up to `embed_concurrency` calls in flight) -> sink (index + docstore)
+
+    Every stage is pulled by the one after it and keeps a bounded backlog, so
+    peak memory depends on workers / batch size / concurrency, not corpus size.
+    Batches reach the sink in file order, so index positions are deterministic.
+    """
+
+    def __init__(self, workers: int = 1, embed_batch_size: int = 256, embed_concurrency: int = 4):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.stats = PipelineStats()
+
+    def _embed_fn(self, embeddings, pool: Optional[ProcessPoolExecutor]) -> Callable[[List[str]], List[List[float]]]:
+        # Network backends overlap fine on threads; CPU-bound ones (local hashing) go to the process pool
+        backend = embeddings.backend if isinstance(embeddings, CachedEmbeddings) else embeddings
+        if pool is None or not getattr(backend, "cpu_bound", False):
+            return embeddings.embed_documents
+
+        def remote(texts: List[str]) -> List[List[float]]:
+            return pool.submit(backend.embed_documents, texts).result()
+
+        if isinstance(embeddings, CachedEmbeddings):
+            return lambda texts: embeddings.embed_documents(texts, embed_misses=remote)
+        return remote
+
+    def run(
+        self,
+        jobs: Iterable[Tuple[str, str]],
+        chunk_fn: ChunkFn,
+        embeddings,
+        sink: Sink,
+        on_file: Optional[Callable[[str, List[Document]], None]] = None,
+        progress: Optional[Callable[[PipelineStats], None]] = None,
+    ) -> PipelineStats:
+        stats = self.stats = PipelineStats()
+        pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        embed = self._embed_fn(embeddings, pool)
+
+        def chunks() -> Iterator[Document]:
+            files = bounded_map(pool, chunk_fn, jobs, 4 * self.workers) if pool else map(chunk_fn, jobs)
+            for name, file_chunks in files:
+                stats.files += 1
+                stats.chunks += len(file_chunks)
+                if on_file is not None:
+                    on_file(name, file_chunks)
+                yield from file_chunks
+
+        def embed_batch(docs: List[Document]) -> Tuple[List[Document], np.ndarray]:
+            return docs, np.asarray(embed([d.page_content for d in docs]), dtype=np.float32)
+
+        try:
+            with ThreadPoolExecutor(self.embed_concurrency, thread_name_prefix="kb-embed") as threads:
+                batches = batched(chunks(), self.embed_batch_size)
+                for docs, vectors in bounded_map(threads, embed_batch, batches, 2 * self.embed_concurrency):
+                    sink(docs, vectors)
+                    stats.vectors += len(docs)
+                    stats.batches += 1
+                    if progress is not None:
+                        progress(stats)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            stats.finished = time.perf_counter()
+        return stats
+
+
+class StreamingFAISSBuilder:
+    """
+    Sink for a full rebuild: vectors go through a StreamingIndexBuilder and
+    chunks are written straight to a fresh on-disk MmapDocstore, so neither
+    the texts nor (past the training sample) the vectors pile up in memory.
+    """
+
+    def __init__(self, root: Path, generation: int, index_builder: StreamingIndexBuilder):
+        self.store: MmapDocstore = fresh_docstore(root, generation)
+        self.positions = PositionMap(self.store)
+        self.index_builder = index_builder
+
+    def __call__(self, docs: List[Document], vectors: np.ndarray) -> None:
+        start = self.index_builder.ntotal
+        ids = [d.metadata["chunk_id"] for d in docs]
+        self.store.add(dict(zip(ids, docs)))
+        self.positions.update(zip(range(start, start + len(ids)), ids))
+        self.index_builder.add(vectors)
+
+    def finish(self, embeddings) -> Tuple[FAISS, Dict[str, Any]]:
+        index, meta = self.index_builder.finish()
+        return FAISS(embeddings, index, self.store, self.positions), meta
+
+
+def vectorstore_sink(vs: FAISS) -> Sink:
+    """Sink for an incremental refresh: appends to an existing (loaded) vector store."""
+
+    def add(docs: List[Document], vectors: np.ndarray) -> None:
+        vs.add_embeddings(
+            zip([d.page_content for d in docs], vectors.tolist()),
+            metadatas=[d.metadata for d in docs],
+            ids=[d.metadata["chunk_id"] for d in docs],
+        )
+
+    return add
@@ -0,0 +1,84 @@
+# src/tools/local_embeddings.py
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+# Very common words carry no topical signal and only add noise to the hashed buckets
+_STOPWORDS = frozenset(
+    """
+    a about an and are as at be been but by can do does for from has have how i if in
+    into is it its may more most of on or our so such than that the their them then
+    there these they this to was we what when where which who why will with you your
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; keeps things like 401k, 1099-b pieces and 3.5 intact."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+    # Stable across processes (unlike hash()), sign bit halves collision bias
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline, CPU-only embeddings: signed feature hashing of word unigrams,
+    word bigrams and character n-grams, sublinear TF weighting, L2-normalised.
+    Stateless, so documents and queries embed identically in any process.
+    """
+
+    # Pure-Python work: build_kb runs it in worker processes rather than threads
+    cpu_bound = True
+
+    def __init__(self, dim: int = 1024, char_ngrams: Tuple[int, int] = (3, 5), bigram_weight: float = 0.5):
+        self.dim = int(dim)
+        self.char_ngrams = char_ngrams
+        self.bigram_weight = bigram_weight
+        lo, hi = char_ngrams
+        self.model = f"local-hashing-v1-d{self.dim}-c{lo}{hi}"
+
+    def _features(self, text: str) -> Counter:
+        tokens = tokenize(text)
+        feats: Counter = Counter()
+        lo, hi = self.char_ngrams
+        for tok in tokens:
+            feats["w:" + tok] += 1.0
+            padded = f"<{tok}>"
+            if len(padded) > lo:
+                for n in range(lo, min(hi, len(padded)) + 1):
+                    for i in range(len(padded) - n + 1):
+                        feats["c:" + padded[i:i + n]] += 0.25
+        for a, b in zip(tokens, tokens[1:]):
+            feats[f"b:{a} {b}"] += self.bigram_weight
+        return feats
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat, tf in self._features(text).items():
+            idx, sign = _bucket(feat, self.dim)
+            vec[idx] += sign * (1.0 + math.log(tf)) if tf >= 1.0 else sign * tf
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t).tolist() for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
@@ -0,0 +1,192 @@
+# src/tools/market_calendar.py
+from __future__ import annotations
+
+from datetime import date, datetime, time as dtime, timedelta
+from functools import lru_cache
+from typing import Optional, Set
+from zoneinfo import ZoneInfo
+
+# US equities (NYSE/Nasdaq) regular session
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+SESSION_OPEN = dtime(9, 30)
+SESSION_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+
+# Yahoo keeps adjusting closing prints for a little while after the bell
+POST_CLOSE_SETTLE = timedelta(minutes=20)
+
+# TTL floor so we never write already-expired entries
+MIN_TTL_SECONDS = 30
+
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    d = date(year, month, 1)
+    d += timedelta(days=(weekday - d.weekday()) % 7)
+    return d + timedelta(weeks=n - 1)
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    d = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return d - timedelta(days=(d.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=32)
+def holidays(year: int) -> Set[date]:
+    """
+    NYSE full-day holidays for a year (rule-based).
+    """
+    out = {
+        _nth_weekday(year, 1, 0, 3),   # MLK Day
+        _nth_weekday(year, 2, 0, 3),   # Presidents' Day
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _last_weekday(year, 5, 0),     # Memorial Day
+        _observed(date(year, 7, 4)),   # Independence Day
+        _nth_weekday(year, 9, 0, 1),   # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)), # Christmas
+    }
+    # New Year's on a Saturday is not observed on the prior Friday
+    ny = date(year, 1, 1)
+    if ny.weekday() != 5:
+        out.add(_observed(ny))
+    if year >= 2022:
+        out.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return out
+
+
+@lru_cache(maxsize=32)
+def early_closes(year: int) -> Set[date]:
+    """
+    13:00 early-close days: July 3, the day after Thanksgiving, Christmas Eve.
+    """
+    out = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}
+    for d in (date(year, 7, 3), date(year, 12, 24)):
+        if d.weekday() < 5 and d not in holidays(year):
+            out.add(d)
+    return out
+
+
+def is_trading_day(d: date) -> bool:
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+def session_bounds(d: date) -> tuple[datetime, datetime]:
+    close = EARLY_CLOSE if d in early_closes(d.year) else SESSION_CLOSE
+    return (
+        datetime.combine(d, SESSION_OPEN, tzinfo=EXCHANGE_TZ),
+        datetime.combine(d, close, tzinfo=EXCHANGE_TZ),
+    )
+
+
+def _now(now: Optional[datetime]) -> datetime:
+    if now is None:
+        return datetime.now(EXCHANGE_TZ)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=EXCHANGE_TZ)
+    return now.astimezone(EXCHANGE_TZ)
+
+
+def is_session_open(now: Optional[datetime] = None) -> bool:
+    now = _now(now)
+    if not is_trading_day(now.date()):
+        return False
+    open_, close = session_bounds(now.date())
+    return open_ <= now < close
+
+
+def next_session_open(now: Optional[datetime] = None) -> datetime:
+    now = _now(now)
+    d = now.date()
+    while True:
+        if is_trading_day(d):
+            open_, _ = session_bounds(d)
+            if open_ > now:
+                return open_
+        d += timedelta(days=1)
+
+
+def next_session_close(now: Optional[datetime] = None) -> datetime:
+    now = _now(now)
+    d = now.date()
+    while True:
+        if is_trading_day(d):
+            _, close = session_bounds(d)
+            if close > now:
+                return close
+        d += timedelta(days=1)
+
+
+def _seconds_until(when: datetime, now: datetime) -> int:
+    return max(int((when - now).total_seconds()), MIN_TTL_SECONDS)
+
+
+def adaptive_ttl(kind: str, intraday_ttl_seconds: int = 60, now: Optional[datetime] = None) -> int:
+    """
+    Cache TTL (seconds) for a market data type, based on the exchange calendar.
+
+    kind:
+      "intraday"   - last price. Short TTL while the session is open; off-hours
+                     it stays valid until the next open (weekends/holidays included).
+      "daily"      - daily bars. Only change at the close, so valid until the
+                     next session close (+ settle window).
+      "market_cap" - moves with price but nobody needs it to the minute; hourly
+                     in session, until the next open otherwise.
+    """
+    now = _now(now)
+    open_now = is_session_open(now)
+
+    if kind == "intraday":
+        if open_now:
+            close = next_session_close(now)
+            return min(intraday_ttl_seconds, _seconds_until(close, now))
+        # Right after the bell closing prints are still settling
+        if is_trading_day(now.date()):
+            _, close = session_bounds(now.date())
+            if close <= now < close + POST_CLOSE_SETTLE:
+                return _seconds_until(close + POST_CLOSE_SETTLE, now)
+        return _seconds_until(next_session_open(now), now)
+
+    if kind == "daily":
+        return _seconds_until(next_session_close(now) + POST_CLOSE_SETTLE, now)
+
+    if kind == "market_cap":
+        if open_now:
+            return min(3600, _seconds_until(next_session_close(now), now))
+        return _seconds_until(next_session_open(now), now)
+
+    raise ValueError(f"Unknown market data kind: {kind}")
+
+
+def quote_ttl_seconds(intraday_ttl_seconds: int = 60, now: Optional[datetime] = None) -> int:
+    """
+    TTL for a full quote payload. The payload bundles last price, daily history
+    and market cap, so it expires with its most volatile part (the last price).
+    """
+    return min(
+        adaptive_ttl("intraday", intraday_ttl_seconds, now),
+        adaptive_ttl("daily", intraday_ttl_seconds, now),
+        adaptive_ttl("market_cap", intraday_ttl_seconds, now),
+    )
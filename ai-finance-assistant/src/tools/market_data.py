@@ -1,9 +1,84 @@
 # src/tools/market_data.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import time
-import yfinance as yf
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
-from .cache import SQLiteTTLCache
+from ..config import settings
+from .cache import CacheNamespace, SQLiteTTLCache
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .market_calendar import quote_ttl_seconds
+from .price_history import PriceHistoryStore, bars_from_frame, bar_dates
+from .quote_providers import QuoteProvider, get_provider
+from .rate_limit import TokenBucket
+from .singleflight import SingleFlight
+
+# Shared by every session in the process so concurrent refreshes don't get us throttled
+_RATE_LIMITER = TokenBucket(
+    rate=settings.market_rate_limit_per_sec,
+    capacity=settings.market_rate_limit_burst,
+)
+
+# Per provider: opens after N consecutive failures; while open we serve cached/stale/local data only
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+# Bump when the quote payload shape changes; old cached payloads are then never read.
+# For changes where old payloads are still fine to show, use invalidate_quote_cache()
+# instead so they keep being served (stale) while the refresh happens.
+QUOTE_CACHE_VERSION = 1
+
+# Coalesces concurrent misses for the same quote:{SYM} key across sessions
+_INFLIGHT = SingleFlight()
+
+# Upper bound on how long a coalesced caller waits for the leader's fetch
+_INFLIGHT_WAIT_SECONDS = 60.0
+
+# Per provider local OHLCV bars; quote misses only download bars newer than what is stored
+_HISTORIES: Dict[str, PriceHistoryStore] = {}
+_STATE_LOCK = threading.Lock()
+
+# Yahoo only serves ~7 days of 1m bars per request
+_INTRADAY_MAX_LOOKBACK_DAYS = 6
+
+# Stale-while-revalidate: stale quotes are returned immediately and refreshed here
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quote-refresh")
+_REVALIDATING: set = set()
+_REVALIDATING_LOCK = threading.Lock()
+
+
+def _breaker(provider: QuoteProvider) -> CircuitBreaker:
+    with _STATE_LOCK:
+        if provider.name not in _BREAKERS:
+            _BREAKERS[provider.name] = CircuitBreaker(
+                failure_threshold=settings.market_breaker_failure_threshold,
+                reset_seconds=settings.market_breaker_reset_seconds,
+            )
+        return _BREAKERS[provider.name]
+
+
+def _history(provider: QuoteProvider) -> PriceHistoryStore:
+    # Kept apart per provider so replayed fixtures never mix with live bars
+    with _STATE_LOCK:
+        if provider.name not in _HISTORIES:
+            _HISTORIES[provider.name] = PriceHistoryStore(Path(settings.market_history_dir) / provider.name)
+        return _HISTORIES[provider.name]
+
+
+class NoPriceError(ValueError):
+    """The provider answered but had no price for the symbol (typo, delisted, ...)."""
+
+
+def _is_transport_error(e: Exception) -> bool:
+    # Network errors (requests' exceptions are OSErrors too) and provider throttling
+    return isinstance(e, OSError) or "RateLimit" in type(e).__name__
+
+
+def _raise_if_transport(e: Exception) -> None:
+    # The history helpers swallow parse errors, but provider outages have to reach the breaker
+    if _is_transport_error(e):
+        raise e
 
 
 def _safe_float(x) -> Optional[float]:
@@ -12,19 +87,23 @@ def _safe_float(x) -> Optional[float]:
     except Exception:
         return None
 
-def _get_daily_closes(ticker: yf.Ticker, days: int = 5):
+# Every path reads unadjusted (as-traded) closes, like the bulk download and
+# fast_info, so a quote doesn't depend on which path served it and the
+# append-only history store never mixes adjustment bases
+def _get_daily_closes(ticker: Any, days: int = 5):
     try:
-        daily = ticker.history(period=f"{days}d", interval="1d")
+        daily = ticker.history(period=f"{days}d", interval="1d", auto_adjust=False)
         if daily is None or daily.empty:
             return []
         closes = daily["Close"].dropna().tolist()
         return [float(x) for x in closes][-days:]
-    except Exception:
+    except Exception as e:
+        _raise_if_transport(e)
         return []
 
-def _get_daily_closes_with_dates(ticker: yf.Ticker, days: int = 5):
+def _get_daily_closes_with_dates(ticker: Any, days: int = 5):
     try:
-        daily = ticker.history(period=f"{days}d", interval="1d")
+        daily = ticker.history(period=f"{days}d", interval="1d", auto_adjust=False)
         if daily is None or daily.empty:
             return {"dates": [], "prices": []}
         daily = daily[daily["Close"].notna()]
@@ -34,10 +113,11 @@ def _get_daily_closes_with_dates(ticker: yf.Ticker, days: int = 5):
             "dates": dates[-days:],
             "prices": [float(x) for x in closes][-days:]
         }
-    except Exception:
+    except Exception as e:
+        _raise_if_transport(e)
         return {"dates": [], "prices": []}
 
-def _get_last_from_history(ticker: yf.Ticker) -> Dict[str, Optional[float]]:
+def _get_last_from_history(ticker: Any) -> Dict[str, Optional[float]]:
     """
     Most reliable path for "price now":
     - Try 1-minute candles for the last trading session
@@ -46,7 +126,7 @@ def _get_last_from_history(ticker: yf.Ticker) -> Dict[str, Optional[float]]:
     """
     # 1) Try intraday 1m (best for current/most recent price)
     try:
-        intraday = ticker.history(period="1d", interval="1m")
+        intraday = ticker.history(period="1d", interval="1m", auto_adjust=False)
         if intraday is not None and not intraday.empty:
             close_series = intraday["Close"].dropna()
             if len(close_series) >= 1:
@@ -54,105 +134,521 @@ def _get_last_from_history(ticker: yf.Ticker) -> Dict[str, Optional[float]]:
                 # previous close from the prior minute if available
                 prev_close = _safe_float(close_series.iloc[-2]) if len(close_series) >= 2 else None
                 return {"last_price": last_price, "previous_close": prev_close}
-    except Exception:
-        pass
+    except Exception as e:
+        _raise_if_transport(e)
 
     # 2) Fallback to daily history
     try:
-        daily = ticker.history(period="5d", interval="1d")
+        daily = ticker.history(period="5d", interval="1d", auto_adjust=False)
         if daily is not None and not daily.empty:
             close_series = daily["Close"].dropna()
             if len(close_series) >= 1:
                 last_price = _safe_float(close_series.iloc[-1])
                 prev_close = _safe_float(close_series.iloc[-2]) if len(close_series) >= 2 else None
                 return {"last_price": last_price, "previous_close": prev_close}
-    except Exception:
-        pass
+    except Exception as e:
+        _raise_if_transport(e)
 
     return {"last_price": None, "previous_close": None}
 
 
-def fetch_quotes(symbols: List[str], cache: SQLiteTTLCache, ttl_seconds: int) -> Dict[str, Any]:
-    results: Dict[str, Any] = {}
+def _new_payload(sym: str, source: str) -> Dict[str, Any]:
+    return {
+        "symbol": sym,
+        "last_price": None,
+        "previous_close": None,
+        "market_cap": None,
+        "currency": None,
+        "source": source,
+        "cache_hit": False,
+        "stale": False,
+        "fetched_at": int(time.time()),
+    }
 
-    for raw in symbols:
-        sym = raw.upper().strip()
-        if not sym:
-            continue
 
-        key = f"quote:{sym}"
-        cached = cache.get(key)
-        if cached:
-            cached["cache_hit"] = True
-            results[sym] = cached
-            continue
+def _error_payload(sym: str, e: Exception) -> Dict[str, Any]:
+    return {
+        "symbol": sym,
+        "error": f"Failed to fetch quote: {e}",
+        "source": "error",
+        "cache_hit": False,
+        "fetched_at": int(time.time()),
+    }
 
-        payload = {
-            "symbol": sym,
-            "last_price": None,
-            "previous_close": None,
-            "market_cap": None,
-            "currency": None,
-            "source": "yfinance",
-            "cache_hit": False,
-            "fetched_at": int(time.time()),
-        }
 
-        try:
-            t = yf.Ticker(sym)
+def _unavailable_payload(sym: str, e: Exception) -> Dict[str, Any]:
+    # Provider-level outage (breaker open): not the symbol's fault, so never negative-cached
+    payload = _error_payload(sym, e)
+    payload["source"] = "unavailable"
+    return payload
+
+
+def _pct_change(lp, pc) -> Optional[float]:
+    if isinstance(lp, (int, float)) and isinstance(pc, (int, float)) and pc != 0:
+        return ((lp - pc) / pc) * 100.0
+    return None
+
 
-            # Try fast_info (sometimes works)
+class _RateLimitedTicker:
+    """Takes a rate-limit token for every provider request made through the ticker."""
+
+    def __init__(self, ticker: Any):
+        self._ticker = ticker
+
+    @property
+    def fast_info(self):
+        _RATE_LIMITER.acquire()
+        return self._ticker.fast_info
+
+    def history(self, *args, **kwargs):
+        _RATE_LIMITER.acquire()
+        return self._ticker.history(*args, **kwargs)
+
+
+def _fetch_one(provider: QuoteProvider, sym: str) -> Dict[str, Any]:
+    """
+    Per-symbol fetch (fast_info + history fallbacks).
+    Raises NoPriceError if the provider has no price for the symbol, and lets
+    transport errors (network, throttling) through.
+    """
+    _breaker(provider).check()
+    payload = _new_payload(sym, provider.name)
+    # Up to four requests (fast_info, daily closes, 1m and 5d history): each one pays its token
+    t = _RateLimitedTicker(provider.ticker(sym))
+
+    # Try fast_info (sometimes works)
+    try:
+        fi = getattr(t, "fast_info", None)
+        if fi:
+            payload["last_price"] = _safe_float(fi.get("last_price"))
+            payload["previous_close"] = _safe_float(fi.get("previous_close"))
+            payload["market_cap"] = _safe_float(fi.get("market_cap"))
+            payload["currency"] = fi.get("currency")
+            history_data = _get_daily_closes_with_dates(t, days=5)
+            payload["history_5d"] = history_data.get("prices", [])
+            payload["history_dates"] = history_data.get("dates", [])
+
+            # percent change
+            lp = payload.get("last_price")
+            pc = payload.get("previous_close")
+
+            # If previous_close missing, try to infer from daily closes
+            if pc is None:
+                hist = payload.get("history_5d") or []
+                if len(hist) >= 2:
+                    pc = hist[-2]
+                    payload["previous_close"] = pc
+
+            payload["pct_change"] = _pct_change(lp, pc)
+    except Exception as e:
+        _raise_if_transport(e)
+
+    # If still missing, use history (more reliable)
+    if payload["last_price"] is None:
+        hist_vals = _get_last_from_history(t)
+        payload["last_price"] = hist_vals["last_price"]
+        # only set previous_close if not already present
+        if payload["previous_close"] is None:
+            payload["previous_close"] = hist_vals["previous_close"]
+
+    # Final validation
+    if payload["last_price"] is None:
+        raise NoPriceError(f"No price returned from {provider.name} (may be rate-limited or blocked).")
+
+    return payload
+
+
+def _download_frames(provider: QuoteProvider, symbols: List[str], interval: str, **window) -> Dict[str, Any]:
+    """
+    One bulk request for all symbols; returns {symbol: OHLCV frame}.
+    window is passed through to the provider (period=... or start=...).
+    """
+    breaker = _breaker(provider)
+    if not breaker.allow():
+        return {}
+    _RATE_LIMITER.acquire()
+    try:
+        frames = provider.download(symbols, interval, **window)
+    except Exception as e:
+        if _is_transport_error(e):
+            breaker.record_failure()
+        else:
+            breaker.release_trial()
+        return {}
+
+    # A missing symbol usually means a typo, not a sick provider: only a full set counts as success
+    if frames and all(sym in frames for sym in symbols):
+        breaker.record_success()
+    else:
+        breaker.release_trial()
+    return frames
+
+
+def _sync_history(provider: QuoteProvider, symbols: List[str], interval: str, backfill_period: str) -> set:
+    """
+    Brings the local store up to date for symbols, downloading only bars at or
+    after each symbol's last stored bar (new symbols get backfill_period).
+    Returns the set of symbols the provider answered for.
+    """
+    store = _history(provider)
+    last = {sym: store.last_timestamp(sym, interval) for sym in symbols}
+    new = [sym for sym, ts in last.items() if ts is None]
+    known = [sym for sym, ts in last.items() if ts is not None]
+
+    groups = []
+    if new:
+        groups.append((new, {"period": backfill_period}))
+    if known:
+        start = datetime.fromtimestamp(min(last[s] for s in known), tz=timezone.utc).date()
+        if interval.endswith("m"):
+            floor = (datetime.now(timezone.utc) - timedelta(days=_INTRADAY_MAX_LOOKBACK_DAYS)).date()
+            start = max(start, floor)
+        groups.append((known, {"start": start.isoformat()}))
+
+    synced = set()
+    for group, window in groups:
+        for sym, sub in _download_frames(provider, group, interval, **window).items():
             try:
-                fi = getattr(t, "fast_info", None)
-                if fi:
-                    payload["last_price"] = _safe_float(fi.get("last_price"))
-                    payload["previous_close"] = _safe_float(fi.get("previous_close"))
-                    payload["market_cap"] = _safe_float(fi.get("market_cap"))
-                    payload["currency"] = fi.get("currency")
-                    history_data = _get_daily_closes_with_dates(t, days=5)
-                    payload["history_5d"] = history_data.get("prices", [])
-                    payload["history_dates"] = history_data.get("dates", [])
-
-                    # percent change
-                    lp = payload.get("last_price")
-                    pc = payload.get("previous_close")
-
-                    # If previous_close missing, try to infer from daily closes
-                    if pc is None:
-                        hist = payload.get("history_5d") or []
-                        if len(hist) >= 2:
-                            pc = hist[-2]
-                            payload["previous_close"] = pc
-
-                    if isinstance(lp, (int, float)) and isinstance(pc, (int, float)) and pc != 0:
-                        payload["pct_change"] = ((lp - pc) / pc) * 100.0
-                    else:
-                        payload["pct_change"] = None
+                store.append(sym, interval, bars_from_frame(sub))
+                synced.add(sym)
             except Exception:
-                pass
+                continue
+    return synced
+
+
+def _fetch_batch(provider: QuoteProvider, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Resolves many symbols with bulk downloads (daily + 1m) that only pull bars
+    newer than the local history store, then builds payloads from local reads.
+    Symbols the provider did not answer for are still served from local
+    history (source="local_history") so the market path works offline.
+    Returns payloads only for symbols that got a price; the rest are left
+    for the per-symbol path.
+    """
+    if not symbols:
+        return {}
+
+    daily_ok = _sync_history(provider, symbols, "1d", settings.market_history_backfill_period)
+    intraday_ok = _sync_history(provider, symbols, "1m", "1d")
+
+    store = _history(provider)
+    results: Dict[str, Dict[str, Any]] = {}
+    for sym in symbols:
+        payload = _new_payload(sym, provider.name)
+
+        d = store.read(sym, "1d", last_n=5)
+        if len(d):
+            payload["history_5d"] = [float(x) for x in d["close"]]
+            payload["history_dates"] = bar_dates(d)
+            payload["last_price"] = _safe_float(d["close"][-1])
+            if len(d) >= 2:
+                payload["previous_close"] = _safe_float(d["close"][-2])
+
+        # Intraday 1m is the best "price now" when it is at least as new as the daily bar
+        m = store.read(sym, "1m", last_n=2)
+        if len(m) and (not len(d) or m["ts"][-1] >= d["ts"][-1]):
+            payload["last_price"] = _safe_float(m["close"][-1])
+            if payload["previous_close"] is None and len(m) >= 2:
+                payload["previous_close"] = _safe_float(m["close"][-2])
+
+        if payload["last_price"] is None:
+            continue
+
+        if sym not in daily_ok and sym not in intraday_ok:
+            payload["source"] = "local_history"
+
+        payload["pct_change"] = _pct_change(payload["last_price"], payload["previous_close"])
+        results[sym] = payload
+
+    return results
+
 
-            # If still missing, use history (more reliable)
-            if payload["last_price"] is None:
-                hist_vals = _get_last_from_history(t)
-                payload["last_price"] = hist_vals["last_price"]
-                # only set previous_close if not already present
-                if payload["previous_close"] is None:
-                    payload["previous_close"] = hist_vals["previous_close"]
+def _fetch_profile(provider: QuoteProvider, sym: str) -> Optional[Dict[str, Any]]:
+    """
+    Currency and share count for sym (from fast_info). Best effort: returns
+    None instead of raising, and never counts toward the breaker.
+    """
+    if _breaker(provider).state == "open":
+        return None
+    try:
+        fi = getattr(_RateLimitedTicker(provider.ticker(sym)), "fast_info", None) or {}
+        shares = _safe_float(fi.get("shares"))
+        if shares is None:
+            # Providers without a share count: derive it from their own cap / price
+            cap, price = _safe_float(fi.get("market_cap")), _safe_float(fi.get("last_price"))
+            shares = cap / price if cap and price else None
+        currency = fi.get("currency")
+    except Exception:
+        return None
+    if shares is None and currency is None:
+        return None
+    return {"shares": shares, "currency": currency}
+
+
+def _attach_profiles(
+    provider: QuoteProvider,
+    payloads: Dict[str, Dict[str, Any]],
+    cache: SQLiteTTLCache,
+    max_workers: int,
+) -> None:
+    """
+    Fills currency and market_cap on batch-path payloads. The bulk download
+    has neither, so the (rarely changing) profile is fetched once per symbol
+    per MARKET_PROFILE_TTL_SECONDS and market cap is derived from the live price.
+    Offline (local_history) payloads only use profiles already cached.
+    """
+    if not payloads:
+        return
+    profiles_ns = _profile_namespace(cache)
+    profiles = profiles_ns.get_many(list(payloads))
+
+    missing = [
+        sym for sym, payload in payloads.items()
+        if sym not in profiles and payload.get("source") != "local_history"
+    ]
+    if missing:
+        workers = max(1, min(int(max_workers or 1), len(missing)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-profiles") as pool:
+            fetched = dict(zip(missing, pool.map(lambda sym: _fetch_profile(provider, sym), missing)))
+        fetched = {sym: prof for sym, prof in fetched.items() if prof}
+        profiles_ns.set_many(fetched, settings.market_profile_ttl_seconds)
+        profiles.update(fetched)
+
+    for sym, payload in payloads.items():
+        prof = profiles.get(sym)
+        if not prof:
+            continue
+        payload["currency"] = prof.get("currency")
+        if prof.get("shares") and payload["last_price"] is not None:
+            payload["market_cap"] = prof["shares"] * payload["last_price"]
 
-            # Final validation
-            if payload["last_price"] is None:
-                raise ValueError("No price returned from Yahoo Finance (may be rate-limited or blocked).")
 
-            cache.set(key, payload, ttl_seconds)
+def _fetch_one_safe(provider: QuoteProvider, sym: str) -> Dict[str, Any]:
+    # Per-symbol error isolation: one bad ticker never fails the whole request.
+    # Only transport failures count toward the breaker; a symbol with no data
+    # is negative-cached but says nothing about the provider's health.
+    breaker = _breaker(provider)
+    try:
+        payload = _fetch_one(provider, sym)
+    except CircuitOpenError as e:
+        return _unavailable_payload(sym, e)
+    except Exception as e:
+        if _is_transport_error(e):
+            breaker.record_failure()
+        else:
+            breaker.release_trial()
+        return _error_payload(sym, e)
+    breaker.record_success()
+    return payload
+
+
+def _fetch_many(provider: QuoteProvider, symbols: List[str], max_workers: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Runs per-symbol fetches on a bounded thread pool, so latency tracks the
+    slowest symbol instead of the sum. The shared token bucket keeps the
+    overall request rate to Yahoo bounded.
+    """
+    workers = max(1, min(int(max_workers or 1), len(symbols)))
+    if workers <= 1:
+        return {sym: _fetch_one_safe(provider, sym) for sym in symbols}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quotes") as pool:
+        payloads = list(pool.map(lambda sym: _fetch_one_safe(provider, sym), symbols))
+    return dict(zip(symbols, payloads))
+
+
+def _quote_namespaces(cache: SQLiteTTLCache) -> Tuple[CacheNamespace, CacheNamespace]:
+    return (
+        cache.namespace("quote", version=QUOTE_CACHE_VERSION),
+        cache.namespace("quote_error", version=QUOTE_CACHE_VERSION, stale_fallback=False),
+    )
+
+
+def _profile_namespace(cache: SQLiteTTLCache) -> CacheNamespace:
+    return cache.namespace("quote_profile", version=QUOTE_CACHE_VERSION)
+
+
+def invalidate_quote_cache(cache: SQLiteTTLCache) -> int:
+    """
+    Drops every cached quote in O(1) (generation bump), e.g. after a provider
+    switch. Previous-generation quotes are still served as stale and refreshed
+    in the background, so this doesn't cause a stampede on the provider.
+    """
+    cache.invalidate_namespace("quote_error")
+    return cache.invalidate_namespace("quote")
+
+
+def _resolve_misses(
+    provider: QuoteProvider,
+    misses: List[str],
+    cache: SQLiteTTLCache,
+    ttl_seconds: int,
+    hard_ttl_seconds: int,
+    batch: bool,
+    max_workers: int,
+) -> Dict[str, Any]:
+    """
+    Fetches quotes for cache-missed symbols and writes them back to the cache.
+    Concurrent requests for the same symbol share one in-flight fetch.
+    """
+    results: Dict[str, Any] = {}
+
+    # Single-flight: only fetch symbols nobody else is already fetching
+    leading: Dict[str, Any] = {}
+    waiting: Dict[str, Any] = {}
+    for sym in misses:
+        call, leader = _INFLIGHT.begin(f"quote:{sym}")
+        if leader:
+            leading[sym] = call
+        else:
+            waiting[sym] = call
+
+    fetched: Dict[str, Dict[str, Any]] = {}
+    try:
+        to_fetch = list(leading)
+        if batch and to_fetch:
+            fetched = _fetch_batch(provider, to_fetch)
+            _attach_profiles(provider, fetched, cache, max_workers)
+        remaining = [sym for sym in to_fetch if sym not in fetched]
+        fetched.update(_fetch_many(provider, remaining, max_workers))
+
+        good: Dict[str, Any] = {}
+        failed: Dict[str, Any] = {}
+        for sym in to_fetch:
+            payload = fetched[sym]
+            # Offline (local-history) answers are served but not cached, so the next call retries
+            if "error" not in payload and payload.get("source") != "local_history":
+                good[sym] = payload
+            elif payload.get("source") == "error":
+                # Negative cache: bad tickers / blocked lookups aren't retried on every rerun
+                failed[sym] = payload
             results[sym] = payload
 
+        # One transaction per TTL class instead of one per symbol
+        quotes_ns, errors_ns = _quote_namespaces(cache)
+        quotes_ns.set_many(good, ttl_seconds, hard_ttl_seconds)
+        errors_ns.set_many(failed, settings.market_negative_ttl_seconds)
+    finally:
+        # Always release waiters, even if something above raised
+        for sym, call in leading.items():
+            _INFLIGHT.finish(
+                f"quote:{sym}",
+                call,
+                value=fetched.get(sym) or _error_payload(sym, RuntimeError("fetch aborted")),
+            )
+
+    for sym, call in waiting.items():
+        try:
+            # Copy so callers can't mutate each other's payloads
+            results[sym] = dict(call.wait(_INFLIGHT_WAIT_SECONDS))
         except Exception as e:
-            results[sym] = {
-                "symbol": sym,
-                "error": f"Failed to fetch quote: {e}",
-                "source": "error",
-                "cache_hit": False,
-                "fetched_at": int(time.time()),
-            }
-
-    return results
\ No newline at end of file
+            results[sym] = _error_payload(sym, e)
+
+    return results
+
+
+def _revalidate(provider: QuoteProvider, symbols: List[str], cache: SQLiteTTLCache, ttl_seconds: int, hard_ttl_seconds: int, batch: bool, max_workers: int) -> None:
+    try:
+        _resolve_misses(provider, symbols, cache, ttl_seconds, hard_ttl_seconds, batch, max_workers)
+    except Exception:
+        pass
+    finally:
+        with _REVALIDATING_LOCK:
+            _REVALIDATING.difference_update(symbols)
+
+
+def _schedule_revalidate(provider: QuoteProvider, symbols: List[str], cache: SQLiteTTLCache, ttl_seconds: int, hard_ttl_seconds: int, batch: bool, max_workers: int) -> None:
+    # Skip symbols a background refresh is already queued/running for
+    with _REVALIDATING_LOCK:
+        todo = [sym for sym in symbols if sym not in _REVALIDATING]
+        _REVALIDATING.update(todo)
+    if todo:
+        _REFRESH_POOL.submit(_revalidate, provider, todo, cache, ttl_seconds, hard_ttl_seconds, batch, max_workers)
+
+
+def fetch_quotes(
+    symbols: List[str],
+    cache: SQLiteTTLCache,
+    ttl_seconds: Optional[int] = None,
+    batch: bool = True,
+    max_workers: Optional[int] = None,
+    hard_ttl_seconds: Optional[int] = None,
+    provider: Optional[QuoteProvider] = None,
+) -> Dict[str, Any]:
+    """
+    Returns {symbol: quote payload}.
+    - provider=None uses the configured provider (MARKET_PROVIDER).
+    - ttl_seconds=None uses the market-hours-aware policy (short TTL in
+      session, valid until the next open off-hours/weekends/holidays).
+    - Fresh cache hits are served as-is.
+    - Stale hits (past ttl_seconds, within hard_ttl_seconds) are served
+      immediately with stale=True and refreshed in the background.
+    - Recently failed symbols are answered from the negative cache.
+    - While the provider circuit breaker is open nothing waits on the provider:
+      stale values are not revalidated and misses are served from local
+      history or returned as "unavailable".
+    - Misses are resolved together with bulk downloads (batch=True); anything
+      the batch could not price is fetched per symbol on a bounded worker pool.
+    """
+    provider = provider or get_provider()
+    if ttl_seconds is None:
+        ttl_seconds = quote_ttl_seconds(settings.market_intraday_ttl_seconds)
+    if max_workers is None:
+        max_workers = settings.market_fetch_workers
+    if hard_ttl_seconds is None:
+        hard_ttl_seconds = settings.market_cache_hard_ttl_seconds
+
+    results: Dict[str, Any] = {}
+    misses: List[str] = []
+    stale: List[str] = []
+
+    wanted = list(dict.fromkeys(s for s in (raw.upper().strip() for raw in symbols) if s))
+
+    # One cache round trip for the whole symbol list (plus one for negative entries)
+    quotes_ns, errors_ns = _quote_namespaces(cache)
+    cached_quotes = quotes_ns.get_many_with_state(wanted)
+    for sym in wanted:
+        cached, is_stale = cached_quotes.get(sym, (None, False))
+        if cached:
+            cached["cache_hit"] = True
+            cached["stale"] = is_stale
+            results[sym] = cached
+            if is_stale:
+                stale.append(sym)
+
+    uncached = [sym for sym in wanted if sym not in results]
+    failed = errors_ns.get_many(uncached) if uncached else {}
+    for sym in uncached:
+        err = failed.get(sym)
+        if err:
+            err["cache_hit"] = True
+            results[sym] = err
+        else:
+            misses.append(sym)
+
+    if stale and _breaker(provider).state != "open":
+        _schedule_revalidate(provider, stale, cache, ttl_seconds, hard_ttl_seconds, batch, max_workers)
+
+    if misses:
+        results.update(_resolve_misses(provider, misses, cache, ttl_seconds, hard_ttl_seconds, batch, max_workers))
+
+    # Keep caller's symbol order
+    ordered: Dict[str, Any] = {}
+    for raw in symbols:
+        sym = raw.upper().strip()
+        if sym in results and sym not in ordered:
+            ordered[sym] = results[sym]
+    return ordered
+
+
+def quote_fetch_stats(provider: Optional[QuoteProvider] = None) -> Dict[str, Any]:
+    """
+    Single-flight counters for quote lookups:
+    issued = fetches that actually went to the provider, coalesced = requests that shared one.
+    Also reports the provider circuit breaker state.
+    """
+    stats: Dict[str, Any] = dict(_INFLIGHT.stats())
+    breaker = _breaker(provider or get_provider()).stats()
+    stats["breaker_state"] = breaker["state"]
+    stats["breaker_consecutive_failures"] = breaker["consecutive_failures"]
+    return stats
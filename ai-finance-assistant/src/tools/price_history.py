@@ -0,0 +1,161 @@
+# src/tools/price_history.py
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+# One fixed-size record per bar. ts is the bar's exchange wall-clock time in
+# epoch seconds (tz stripped), so dates read back match what Yahoo shows.
+BAR_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+_EMPTY = np.zeros(0, dtype=BAR_DTYPE)
+
+
+def bars_from_frame(frame) -> np.ndarray:
+    """
+    Converts a yfinance OHLCV DataFrame into a BAR_DTYPE array (rows without Close dropped).
+    """
+    if frame is None or frame.empty or "Close" not in frame:
+        return _EMPTY
+    frame = frame[frame["Close"].notna()]
+    if frame.empty:
+        return _EMPTY
+
+    idx = frame.index
+    if getattr(idx, "tz", None) is not None:
+        idx = idx.tz_localize(None)
+
+    bars = np.zeros(len(frame), dtype=BAR_DTYPE)
+    bars["ts"] = idx.to_numpy(dtype="datetime64[s]").astype("int64")
+    for col, field in (("Open", "open"), ("High", "high"), ("Low", "low"), ("Close", "close"), ("Volume", "volume")):
+        if col in frame:
+            bars[field] = frame[col].astype("float64").to_numpy()
+        else:
+            bars[field] = np.nan
+    return bars
+
+
+def bar_dates(bars: np.ndarray) -> List[str]:
+    return [datetime.fromtimestamp(int(ts), tz=timezone.utc).strftime("%Y-%m-%d") for ts in bars["ts"]]
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive flock on <path>.lock, held across the read-check-write of an append."""
+    if fcntl is None:
+        yield
+        return
+    with open(path.with_name(path.name + ".lock"), "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class PriceHistoryStore:
+    """
+    Local append-only OHLCV store.
+    Layout: <root>/<interval>/<SYMBOL>.bin, a flat array of BAR_DTYPE records
+    sorted by ts. Reads are memory-mapped; writes only ever append newer bars.
+    The one exception is the newest bar, which is rewritten in place while its
+    session is still open (same ts, updated close/volume). Appends take a
+    per-file lock (<SYMBOL>.bin.lock) so app workers can share the store.
+    """
+
+    def __init__(self, root_dir):
+        self.root = Path(root_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, interval: str) -> Path:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in symbol.upper())
+        return self.root / interval / f"{safe}.bin"
+
+    def read(self, symbol: str, interval: str, last_n: Optional[int] = None) -> np.ndarray:
+        """
+        Memory-mapped read-only view of stored bars (optionally just the newest last_n).
+        """
+        path = self._path(symbol, interval)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return _EMPTY
+        count = size // BAR_DTYPE.itemsize
+        if count == 0:
+            return _EMPTY
+
+        bars = np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(count,))
+        if last_n is not None:
+            bars = bars[-last_n:]
+        return bars
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        tail = self.read(symbol, interval, last_n=1)
+        return int(tail["ts"][0]) if len(tail) else None
+
+    def append(self, symbol: str, interval: str, bars: np.ndarray) -> int:
+        """
+        Appends bars newer than the last stored one. Returns the number of new bars.
+        """
+        if bars is None or len(bars) == 0:
+            return 0
+        bars = np.sort(np.asarray(bars, dtype=BAR_DTYPE), order="ts")
+
+        path = self._path(symbol, interval)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock, _file_lock(path):
+            last_ts = self.last_timestamp(symbol, interval)
+            if last_ts is not None:
+                # Still-open bar: overwrite the tail record in place
+                same = bars[bars["ts"] == last_ts]
+                if len(same):
+                    offset = (path.stat().st_size // BAR_DTYPE.itemsize - 1) * BAR_DTYPE.itemsize
+                    with open(path, "r+b") as f:
+                        f.seek(offset)
+                        f.write(same[-1:].tobytes())
+                bars = bars[bars["ts"] > last_ts]
+
+            if len(bars) == 0:
+                return 0
+
+            # Drop duplicate timestamps inside the incoming batch (keep last)
+            _, keep = np.unique(bars["ts"][::-1], return_index=True)
+            bars = bars[::-1][keep]
+
+            with open(path, "ab") as f:
+                f.write(bars.tobytes())
+            return len(bars)
+
+    def symbols(self, interval: str) -> List[str]:
+        d = self.root / interval
+        if not d.exists():
+            return []
+        return sorted(p.stem for p in d.glob("*.bin"))
+
+    def stats(self) -> Dict[str, int]:
+        files = list(self.root.glob("*/*.bin"))
+        return {
+            "files": len(files),
+            "bars": sum(p.stat().st_size for p in files) // BAR_DTYPE.itemsize,
+        }
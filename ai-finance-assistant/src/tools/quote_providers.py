@@ -0,0 +1,269 @@
+# src/tools/quote_providers.py
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from ..config import settings
+
+
+class QuoteProvider(ABC):
+    """
+    What market_data needs from a quote source.
+    - ticker(symbol): object with .fast_info (dict-like) and .history(period=, interval=, auto_adjust=)
+    - download(symbols, interval, period=/start=): {symbol: OHLCV frame} in one request
+    Bars are unadjusted (as traded) unless history() is asked otherwise.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def ticker(self, symbol: str) -> Any:
+        ...
+
+    @abstractmethod
+    def download(self, symbols: List[str], interval: str, **window) -> Dict[str, pd.DataFrame]:
+        ...
+
+
+def _split_download(frame, symbols: List[str]) -> Dict[str, Any]:
+    """
+    Splits a multi-ticker yf.download() frame into {symbol: per-symbol frame}.
+    Handles both MultiIndex (ticker, field) columns and the flat single-ticker shape.
+    """
+    out: Dict[str, Any] = {}
+    if frame is None or frame.empty:
+        return out
+
+    cols = frame.columns
+    if getattr(cols, "nlevels", 1) > 1:
+        tickers = set(cols.get_level_values(0))
+        for sym in symbols:
+            if sym in tickers:
+                out[sym] = frame[sym]
+    elif len(symbols) == 1:
+        out[symbols[0]] = frame
+    return out
+
+
+class YFinanceProvider(QuoteProvider):
+    name = "yfinance"
+
+    def ticker(self, symbol: str) -> Any:
+        import yfinance as yf
+
+        return yf.Ticker(symbol)
+
+    def download(self, symbols: List[str], interval: str, **window) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        frame = yf.download(
+            symbols,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=False,
+            **window,
+        )
+        return _split_download(frame, symbols)
+
+
+# ---------------------------
+# Offline replay
+# ---------------------------
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def _slice_window(frame: pd.DataFrame, period: Optional[str] = None, start: Optional[str] = None) -> pd.DataFrame:
+    """
+    Applies a yfinance-style window to a recorded frame. "Now" is the end of
+    the recording, so replays are deterministic regardless of the wall clock.
+    """
+    if frame.empty:
+        return frame
+
+    if start is not None:
+        ts = pd.Timestamp(start)
+        if frame.index.tz is not None and ts.tz is None:
+            ts = ts.tz_localize(frame.index.tz)
+        return frame[frame.index >= ts]
+
+    if not period or period == "max":
+        return frame
+
+    m = _PERIOD_RE.match(period)
+    if not m:
+        return frame
+    n, unit = int(m.group(1)), m.group(2)
+
+    if unit == "d":
+        # N trading sessions, like Yahoo
+        days = frame.index.normalize().unique()[-n:]
+        return frame[frame.index.normalize().isin(days)]
+
+    offsets = {"wk": pd.DateOffset(weeks=n), "mo": pd.DateOffset(months=n), "y": pd.DateOffset(years=n)}
+    return frame[frame.index > frame.index[-1] - offsets[unit]]
+
+
+class _ReplayTicker:
+    def __init__(self, provider: "ReplayProvider", symbol: str):
+        self._provider = provider
+        self.symbol = symbol
+
+    @property
+    def fast_info(self) -> Dict[str, Any]:
+        self._provider._simulate()
+        return self._provider._fast_info(self.symbol)
+
+    def history(self, period: str = "1mo", interval: str = "1d", auto_adjust: bool = False) -> pd.DataFrame:
+        # Fixtures are recorded unadjusted; auto_adjust is accepted for interface parity only
+        self._provider._simulate()
+        return _slice_window(self._provider._bars(self.symbol, interval), period=period)
+
+
+class ReplayProvider(QuoteProvider):
+    """
+    Deterministic provider that serves recorded fixtures from disk:
+      <root>/<SYMBOL>/<interval>.csv   OHLCV bars (index column = timestamp)
+      <root>/<SYMBOL>/fast_info.json   {"last_price", "previous_close", "market_cap", "currency"}
+    Every call sleeps latency_ms (+/- jitter) and fails with failure_rate,
+    using a seeded RNG so benchmark runs are repeatable.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        root_dir,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.root = Path(root_dir)
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.failure_rate = float(failure_rate)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+        self.calls = 0
+
+    def _simulate(self) -> None:
+        with self._rng_lock:
+            self.calls += 1
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise ConnectionError("Replay provider injected failure")
+
+    def _bars(self, symbol: str, interval: str) -> pd.DataFrame:
+        key = (symbol.upper(), interval)
+        frame = self._frames.get(key)
+        if frame is None:
+            path = self.root / symbol.upper() / f"{interval}.csv"
+            if not path.exists():
+                frame = pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+            else:
+                frame = pd.read_csv(path, index_col=0)
+                frame.index = pd.to_datetime(frame.index, utc=True).tz_convert("America/New_York")
+                frame = frame.sort_index()
+            self._frames[key] = frame
+        return frame
+
+    def _fast_info(self, symbol: str) -> Dict[str, Any]:
+        path = self.root / symbol.upper() / "fast_info.json"
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def ticker(self, symbol: str) -> Any:
+        return _ReplayTicker(self, symbol.upper())
+
+    def download(self, symbols: List[str], interval: str, **window) -> Dict[str, pd.DataFrame]:
+        self._simulate()
+        out: Dict[str, pd.DataFrame] = {}
+        for sym in symbols:
+            sub = _slice_window(self._bars(sym, interval), period=window.get("period"), start=window.get("start"))
+            if not sub.empty:
+                out[sym] = sub
+        return out
+
+
+def record_fixtures(
+    symbols: List[str],
+    out_dir,
+    source: Optional[QuoteProvider] = None,
+    daily_period: str = "1y",
+) -> Dict[str, str]:
+    """
+    Records ReplayProvider fixtures (daily + 1m bars and fast_info) from a live provider.
+    Returns {symbol: "ok" | error message}.
+    """
+    source = source or YFinanceProvider()
+    root = Path(out_dir)
+    status: Dict[str, str] = {}
+
+    for raw in symbols:
+        sym = raw.upper().strip()
+        if not sym:
+            continue
+        try:
+            t = source.ticker(sym)
+            sym_dir = root / sym
+            sym_dir.mkdir(parents=True, exist_ok=True)
+
+            for interval, period in (("1d", daily_period), ("1m", "5d")):
+                frame = t.history(period=period, interval=interval, auto_adjust=False)
+                if frame is not None and not frame.empty:
+                    frame.to_csv(sym_dir / f"{interval}.csv")
+
+            fi = getattr(t, "fast_info", None) or {}
+            info = {k: fi.get(k) for k in ("last_price", "previous_close", "market_cap", "currency")}
+            (sym_dir / "fast_info.json").write_text(json.dumps(info, default=float, indent=2), encoding="utf-8")
+            status[sym] = "ok"
+        except Exception as e:
+            status[sym] = f"failed: {e}"
+    return status
+
+
+_PROVIDER: Optional[QuoteProvider] = None
+_PROVIDER_LOCK = threading.Lock()
+
+
+def get_provider() -> QuoteProvider:
+    """
+    Process-wide provider selected by MARKET_PROVIDER ("yfinance" or "replay").
+    """
+    global _PROVIDER
+    with _PROVIDER_LOCK:
+        if _PROVIDER is None:
+            if settings.market_provider == "replay":
+                _PROVIDER = ReplayProvider(
+                    settings.market_replay_dir,
+                    latency_ms=settings.market_replay_latency_ms,
+                    failure_rate=settings.market_replay_failure_rate,
+                    seed=settings.market_replay_seed,
+                )
+            else:
+                _PROVIDER = YFinanceProvider()
+        return _PROVIDER
+
+
+def set_provider(provider: Optional[QuoteProvider]) -> None:
+    """Overrides the process-wide provider (None resets to the configured one)."""
+    global _PROVIDER
+    with _PROVIDER_LOCK:
+        _PROVIDER = provider
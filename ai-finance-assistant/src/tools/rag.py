@@ -1,17 +1,71 @@
 # src/tools/rag.py
 from __future__ import annotations
 
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List, Sequence, Set, Tuple
 
 from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 
 from ..config import settings
+from .answer_cache import SemanticAnswerCache, depends_on_history, get_answer_cache
+from .bm25 import BM25Index
+from .docstore import (
+    MmapDocstore,
+    PositionMap,
+    docstore_dir,
+    docstore_exists,
+    import_pickle_docstore,
+    prune_generations,
+    write_docstore,
+)
+from .cache import CacheNamespace, get_app_cache
+from .faiss_index import (
+    MIN_ANN_VECTORS,
+    StreamingIndexBuilder,
+    apply_search_params,
+    describe_index,
+    index_path,
+    read_index,
+    read_index_meta,
+    supports_remove,
+    write_index,
+    write_index_meta,
+)
+from .embedding_cache import embedding_model_name, with_embedding_cache
+from .kb_pipeline import KBBuildPipeline, PipelineStats, StreamingFAISSBuilder, vectorstore_sink
+from .local_embeddings import HashingEmbeddings
+from .retrieval import RETRIEVAL_CACHE_VERSION, HybridRetriever, RetrievalResult, normalize_query
+from .vector_shards import CategoryShard, build_category_shards, load_shard, save_shards, shard_catalog, update_shards
+from .kb_manifest import (
+    chunk_id,
+    diff_kb,
+    index_state,
+    load_manifest,
+    next_index_state,
+    save_manifest,
+    stale_chunk_ids,
+)
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+
+# Indexes built before the manifest tracked params were embedded with the OpenAI default
+_LEGACY_EMBEDDING_MODEL = "text-embedding-ada-002"
 
 _VECTORSTORE: Optional[FAISS] = None
+_BM25: Optional[BM25Index] = None
+_SHARDS: Dict[str, Optional[CategoryShard]] = {}
+_INDEX_VERSION: Optional[int] = None
+_LOADED_GENERATION: Optional[int] = None
+_GENERATION_CHECKED_AT = 0.0
+
+# How long a process trusts its loaded index generation before re-reading index_meta.json
+_GENERATION_REFRESH_SECONDS = 5.0
 
 def _parse_header_fields(text: str) -> tuple[str | None, str | None]:
     """
@@ -31,74 +85,550 @@ def _parse_header_fields(text: str) -> tuple[str | None, str | None]:
     return title, category
 
 
-def _load_kb_documents(kb_dir) -> List:
-    from pathlib import Path
-    from langchain_core.documents import Document
+def _kb_path() -> Path:
+    return Path(settings.kb_dir) if not isinstance(settings.kb_dir, Path) else settings.kb_dir
+
+
+def _index_dir() -> Path:
+    return Path(settings.faiss_index_dir) if not isinstance(settings.faiss_index_dir, Path) else settings.faiss_index_dir
+
 
+def _manifest_path() -> Path:
+    # sources_manifest.json sits next to sample_articles/
+    return _kb_path().parent / "sources_manifest.json"
+
+
+def _load_kb_file(path: Path) -> Document:
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    title, category = _parse_header_fields(text)
+    return Document(
+        page_content=text,
+        metadata={
+            "source": path.name,          # filename
+            "title": title or path.stem,  # fallback
+            "category": category or "Uncategorized",
+        },
+    )
+
+
+def _load_kb_documents(kb_dir) -> List:
     kb_path = Path(kb_dir) if not isinstance(kb_dir, Path) else kb_dir
     if not kb_path.exists():
         raise FileNotFoundError(f"KB_DIR not found: {kb_path}")
 
-    docs = []
-    for path in kb_path.glob("*.txt"):
-        text = path.read_text(encoding="utf-8", errors="ignore")
-        title, category = _parse_header_fields(text)
-
-        docs.append(
-            Document(
-                page_content=text,
-                metadata={
-                    "source": path.name,          # filename
-                    "title": title or path.stem,  # fallback
-                    "category": category or "Uncategorized",
-                },
-            )
-        )
+    docs = [_load_kb_file(path) for path in sorted(kb_path.glob("*.txt"))]
 
     if not docs:
         raise ValueError(f"No .txt files found in KB_DIR: {kb_path}")
 
     return docs
 
-def build_or_load_faiss() -> FAISS:
+
+def _splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+
+def _chunk_file(path: Path, digest: str, splitter: RecursiveCharacterTextSplitter) -> List[Document]:
+    """Split one KB file; every chunk carries its stable id in metadata."""
+    chunks = splitter.split_documents([_load_kb_file(path)])
+    for i, chunk in enumerate(chunks):
+        chunk.metadata["chunk_id"] = chunk_id(path.name, digest, i)
+    return chunks
+
+
+def _chunk_job(job: Tuple[str, str]) -> Tuple[str, List[Document]]:
+    """build_kb worker entry point: (path, sha256) -> (file name, chunks)."""
+    path = Path(job[0])
+    return path.name, _chunk_file(path, job[1], _splitter())
+
+
+def _embedding_backend():
+    backend = (settings.embedding_backend or "openai").lower()
+    if backend == "local":
+        return HashingEmbeddings(dim=settings.local_embedding_dim)
+    if backend == "openai":
+        return OpenAIEmbeddings(api_key=settings.openai_api_key)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {settings.embedding_backend!r} (expected 'openai' or 'local')")
+
+
+def _get_embeddings():
+    backend = _embedding_backend()
+    return with_embedding_cache(backend, settings.embedding_cache_path if settings.embedding_cache_enabled else None)
+
+
+def _index_params(embeddings) -> Dict[str, Any]:
+    # Anything that changes every vector: if these differ from the manifest we rebuild from scratch
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": embedding_model_name(embeddings),
+        **_index_spec(),
+    }
+
+
+def _index_spec() -> Dict[str, Any]:
+    # Structural index settings; query-time knobs (nprobe/efSearch) are applied on load instead
+    return {
+        "index_type": settings.faiss_index_type.lower(),
+        "nlist": settings.faiss_nlist,
+        "pq_m": settings.faiss_pq_m,
+        "hnsw_m": settings.faiss_hnsw_m,
+    }
+
+
+def _index_builder(expected_total: int = 0) -> StreamingIndexBuilder:
+    spec = _index_spec()
+    return StreamingIndexBuilder(
+        spec["index_type"],
+        nlist=spec["nlist"],
+        pq_m=spec["pq_m"],
+        hnsw_m=spec["hnsw_m"],
+        train_sample=settings.faiss_train_sample,
+        expected_total=expected_total,
+    )
+
+
+def _streaming_builder(index_dir: Path, expected_chunks: int) -> StreamingFAISSBuilder:
+    """Full-rebuild sink; the docstore is written as the next generation and published on save."""
+    return StreamingFAISSBuilder(
+        docstore_dir(index_dir), _index_generation(index_dir) + 1, _index_builder(expected_chunks)
+    )
+
+
+def _build_shards(vs: FAISS, categories: Optional[Set[str]] = None) -> Dict[str, CategoryShard]:
+    # Build/refresh time only; the embedding function is just the fallback for indexes with lossy codes
+    shards = build_category_shards(vs, vs.embedding_function.embed_documents, _index_builder, categories)
+    for shard in shards.values():
+        apply_search_params(shard.index, settings.faiss_nprobe, settings.faiss_ef_search)
+    return shards
+
+
+def _kb_pipeline(workers: Optional[int] = None) -> KBBuildPipeline:
+    return KBBuildPipeline(
+        workers=settings.kb_build_workers if workers is None else workers,
+        embed_batch_size=settings.kb_embed_batch_size,
+        embed_concurrency=settings.kb_embed_concurrency,
+    )
+
+
+def _bm25_path() -> Path:
+    return _index_dir() / "bm25.npz"
+
+
+def _build_bm25(vs: FAISS) -> BM25Index:
+    # Full build from the docstore; incremental refreshes go through _refresh_bm25 instead
+    if isinstance(vs.docstore, MmapDocstore):
+        stored = vs.docstore.iter_documents()  # position order, texts read one at a time
+    else:
+        ids = (vs.index_to_docstore_id[pos] for pos in range(vs.index.ntotal))
+        stored = ((doc_id, vs.docstore.search(doc_id)) for doc_id in ids)
+    return BM25Index.build(
+        (doc_id, doc.page_content, (doc.metadata or {}).get("category"))
+        for doc_id, doc in stored
+        if isinstance(doc, Document)
+    )
+
+
+def _refresh_bm25(vs: FAISS, ntotal_before: int, removed: List[str], added: List[Tuple[str, str, str]]) -> BM25Index:
+    """Applies one refresh's removed / added chunks to the current BM25 postings (full build if it's missing or out of date)."""
+    path = _bm25_path()
+    base = _BM25 if _BM25 is not None else (BM25Index.load(path) if path.exists() else None)
+    if base is None or len(base) != ntotal_before:
+        return _build_bm25(vs)
+    return base.updated(removed, added)
+
+
+def _shards_current(catalog: Dict[str, Any], ntotal: int) -> bool:
+    return bool(catalog) and sum(e["count"] for e in catalog.values()) == ntotal
+
+
+def _refresh_shards(index_dir: Path, vs: FAISS, ntotal_before: int, categories: Set[str]) -> None:
+    """Rebuilds only the category shards a refresh touched (all of them if the saved set is out of date)."""
+    if not _shards_current(shard_catalog(index_dir), ntotal_before):
+        _SHARDS.clear()
+        _SHARDS.update(_build_shards(vs))
+        save_shards(index_dir, _SHARDS)
+        return
+    if not categories:
+        return
+    shards = _build_shards(vs, categories)
+    update_shards(index_dir, {category: shards.get(category) for category in categories})
+    for category in categories:
+        _SHARDS[category] = shards.get(category)
+
+
+def _chunk_categories(vs: FAISS, doc_ids: List[str]) -> Set[str]:
+    categories = set()
+    for doc_id in doc_ids:
+        doc = vs.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            categories.add((doc.metadata or {}).get("category") or "Uncategorized")
+    return categories
+
+
+def get_bm25_index() -> BM25Index:
+    """BM25 index persisted next to index.faiss; built from the docstore if missing or out of date."""
+    global _BM25
+    vs = build_or_load_faiss()
+    if _BM25 is not None and len(_BM25) == vs.index.ntotal:
+        return _BM25
+
+    path = _bm25_path()
+    bm25 = BM25Index.load(path) if path.exists() else None
+    if bm25 is None or len(bm25) != vs.index.ntotal:
+        bm25 = _build_bm25(vs)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        bm25.save(path)
+    _BM25 = bm25
+    return _BM25
+
+
+def get_category_shard(category: str) -> Optional[CategoryShard]:
     """
-    Loads FAISS index if (index.faiss AND index.pkl) exist.
-    Otherwise builds from KB text files and saves locally.
+    Per-category sub-index, or None if the category has no chunks or the
+    saved shards don't match the index (e.g. one built before sharding).
+    Shards are only built by refresh_kb_index; without one, retrieval
+    post-filters the global search by category.
     """
-    global _VECTORSTORE
-    if _VECTORSTORE is not None:
-        return _VECTORSTORE
+    vs = build_or_load_faiss()
+    if category in _SHARDS:
+        return _SHARDS[category]
 
-    # Ensure settings.faiss_index_dir is a Path object
-    index_dir = Path(settings.faiss_index_dir) if not isinstance(settings.faiss_index_dir, Path) else settings.faiss_index_dir
-    faiss_file = index_dir / "index.faiss"
-    pkl_file = index_dir / "index.pkl"
+    index_dir = _index_dir()
+    catalog = shard_catalog(index_dir)
+    if not _shards_current(catalog, vs.index.ntotal):
+        _SHARDS[category] = None
+        return None
 
-    embeddings = OpenAIEmbeddings(api_key=settings.openai_api_key)
+    shard = load_shard(index_dir, category, catalog, mmap=settings.faiss_mmap)
+    if shard is not None:
+        apply_search_params(shard.index, settings.faiss_nprobe, settings.faiss_ef_search)
+    _SHARDS[category] = shard
+    return _SHARDS[category]
+
+
+def kb_index_version() -> int:
+    """Version of the loaded KB index (bumped by refresh_kb_index whenever content changes)."""
+    global _INDEX_VERSION
+    if _INDEX_VERSION is None:
+        _INDEX_VERSION = int(index_state(load_manifest(_manifest_path())).get("version", 0))
+    return _INDEX_VERSION
+
+
+def _retrieval_cache() -> Optional[CacheNamespace]:
+    if not settings.rag_retrieval_cache_enabled:
+        return None
+    return get_app_cache().namespace("rag_retrieval", version=RETRIEVAL_CACHE_VERSION, stale_fallback=False)
+
+
+def _index_generation(index_dir: Path) -> int:
+    # 0 = an index saved before generations (index.faiss + docstore/docs.db)
+    return int(read_index_meta(index_dir).get("generation", 0))
 
-    # ✅ Only load if BOTH files exist
-    if faiss_file.exists() and pkl_file.exists():
-        _VECTORSTORE = FAISS.load_local(
-            str(index_dir),
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True,
-        )
-        return _VECTORSTORE
 
-    # ✅ Otherwise build
-    docs = _load_kb_documents(settings.kb_dir)
+def _index_files_exist(index_dir: Path) -> bool:
+    # index.pkl only counts as a legacy docstore that _load_vectorstore imports once
+    generation = _index_generation(index_dir)
+    return index_path(index_dir, generation).exists() and (
+        docstore_exists(index_dir, generation) or (not generation and (index_dir / "index.pkl").exists())
+    )
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-    chunks = splitter.split_documents(docs)
 
-    _VECTORSTORE = FAISS.from_documents(chunks, embeddings)
+def _load_vectorstore(index_dir: Path, embeddings, mmap: bool = False) -> FAISS:
+    """
+    The published generation's index + mmap docstore; chunk texts are only
+    read when a hit is returned. Neither file changes once published, so
+    positions stay aligned with the vectors however other processes refresh.
+    With mmap=True the vectors are mapped read-only and shared across worker
+    processes; such a store must not be added to (refresh_kb_index loads its own copy).
+    """
+    generation = _index_generation(index_dir)
+    if not docstore_exists(index_dir, generation):
+        import_pickle_docstore(index_dir)
+    store = MmapDocstore(docstore_dir(index_dir), generation, writable=False)
+    index = read_index(index_path(index_dir, generation), mmap=mmap)
+    apply_search_params(index, settings.faiss_nprobe, settings.faiss_ef_search)
+    return FAISS(embeddings, index, store, PositionMap(store))
+
+
+def _fork_vectorstore(vs: FAISS) -> None:
+    """Points a loaded store at a writable copy of its docstore (the next generation) before editing it."""
+    old = vs.docstore
+    vs.docstore = old.fork(old.generation + 1)
+    vs.index_to_docstore_id = PositionMap(vs.docstore)
+    old.close()
+
+
+def _save_vectorstore(vs: FAISS, index_dir: Path, meta: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Publishes vs as the next generation: index-<n>.faiss and docstore/docs-<n>.db
+    are written first, then index_meta.json is switched to point at them.
+    The previous generation is kept for readers that are loading it right now.
+    """
     index_dir.mkdir(parents=True, exist_ok=True)
-    _VECTORSTORE.save_local(str(index_dir))
+    root = docstore_dir(index_dir)
+    generation = _index_generation(index_dir) + 1
+    if isinstance(vs.docstore, MmapDocstore) and vs.docstore.root == root and vs.docstore.generation == generation:
+        # Forked by an incremental refresh, or streamed by a full rebuild
+        vs.docstore.flush(vs.index_to_docstore_id)
+    else:
+        # Any other docstore (e.g. an InMemoryDocstore from FAISS.from_documents): write it out, drop the RAM copy
+        ids = [vs.index_to_docstore_id[pos] for pos in range(vs.index.ntotal)]
+        vs.docstore = write_docstore(root, generation, ((doc_id, vs.docstore.search(doc_id)) for doc_id in ids))
+    vs.index_to_docstore_id = PositionMap(vs.docstore)
+
+    write_index(vs.index, index_path(index_dir, generation))
+    # index_meta.json records what was built (type/factory/training) so loading needs no settings to match
+    meta = dict(meta or read_index_meta(index_dir) or describe_index(vs.index))
+    meta["ntotal"] = int(vs.index.ntotal)
+    meta["generation"] = generation
+    write_index_meta(index_dir, meta)  # readers switch to the new generation here
+    _prune_generations(index_dir, {generation, generation - 1})
+    (index_dir / "index.pkl").unlink(missing_ok=True)  # superseded by docstore/
+
+
+def _prune_generations(index_dir: Path, keep: Set[int]) -> None:
+    prune_generations(docstore_dir(index_dir), keep)
+    for path in index_dir.glob("index*.faiss"):
+        generation = int(path.stem.split("-")[1]) if "-" in path.stem else 0
+        if generation not in keep and generation < max(keep):
+            path.unlink()
+
+
+def _generation_changed(index_dir: Path) -> bool:
+    """True if another process published a new index since this one loaded (re-checked every few seconds)."""
+    global _GENERATION_CHECKED_AT
+    now = time.monotonic()
+    if now - _GENERATION_CHECKED_AT < _GENERATION_REFRESH_SECONDS:
+        return False
+    _GENERATION_CHECKED_AT = now
+    return _index_generation(index_dir) != _LOADED_GENERATION
+
+
+def refresh_kb_index(
+    progress: Optional[Callable[[PipelineStats], None]] = None, workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Brings the FAISS index in line with KB_DIR using the per-file hashes in
+    sources_manifest.json: only added/changed files are chunked and embedded,
+    vectors of changed/removed files are deleted. BM25 postings and the
+    category shards are patched for just those chunks and categories. Files
+    stream through KBBuildPipeline (see tools/kb_pipeline.py); `progress` is
+    called after every embedded batch. `workers` overrides KB_BUILD_WORKERS
+    (scripts/build_kb asks for a process pool; the app chunks in-process).
+    Returns a small report.
+    """
+    global _VECTORSTORE, _BM25, _INDEX_VERSION, _LOADED_GENERATION
+    started = time.perf_counter()
+
+    index_dir = _index_dir()
+    manifest_path = _manifest_path()
+    manifest = load_manifest(manifest_path)
+    state = index_state(manifest)
+
+    embeddings = _get_embeddings()
+    params = _index_params(embeddings)
+
+    vs: Optional[FAISS] = None
+    meta: Optional[Dict[str, Any]] = None
+    # Legacy index (no per-file ids), missing index, or new chunking/embedding/index params
+    full_rebuild = not (state.get("files") and _index_files_exist(index_dir)) or state.get("params") != params
+    if not full_rebuild:
+        vs = _load_vectorstore(index_dir, embeddings)
+        diff = diff_kb(_kb_path(), state)
+        built_type = read_index_meta(index_dir).get("type", "flat")
+        if stale_chunk_ids(state, diff) and not supports_remove(vs.index):
+            # IVF/HNSW can't delete by position; rebuild (unchanged chunks come from the embedding cache)
+            full_rebuild = True
+        elif built_type != params["index_type"] and vs.index.ntotal >= MIN_ANN_VECTORS:
+            # Was built as a Flat fallback while small; the corpus is now big enough for the ANN type
+            full_rebuild = True
+    if full_rebuild:
+        vs = None
+        state = {"version": state.get("version", 0)}
+
+    diff = diff_kb(_kb_path(), state)
+    if not diff.digests:
+        raise ValueError(f"No .txt files found in KB_DIR: {_kb_path()}")
+
+    incremental = vs is not None
+    ntotal_before = vs.index.ntotal if incremental else 0
+    stale = stale_chunk_ids(state, diff)
+    touched: Set[str] = set()  # categories whose shard has to be rebuilt
+    if incremental and not diff.is_empty:
+        _fork_vectorstore(vs)
+    if incremental and stale:
+        touched = _chunk_categories(vs, stale)
+        vs.delete(stale)
+
+    kb_dir = _kb_path()
+    names = diff.added + diff.changed
+    new_chunks: Dict[str, List[str]] = {}
+    added: List[Tuple[str, str, str]] = []  # (chunk id, text, category), only kept for incremental refreshes
+
+    def on_file(name: str, chunks: List[Document]) -> None:
+        new_chunks[name] = [c.metadata["chunk_id"] for c in chunks]
+        if incremental:
+            for c in chunks:
+                category = c.metadata.get("category") or "Uncategorized"
+                added.append((c.metadata["chunk_id"], c.page_content, category))
+                touched.add(category)
+
+    pipeline = _kb_pipeline(workers)
+    builder: Optional[StreamingFAISSBuilder] = None
+    if names:
+        if vs is None:
+            # Rough chunk count from file sizes, only used to size IVF lists
+            approx_chunks = sum((kb_dir / n).stat().st_size for n in names) // (CHUNK_SIZE - CHUNK_OVERLAP)
+            builder = _streaming_builder(index_dir, approx_chunks)
+        jobs = ((str(kb_dir / name), diff.digests[name]) for name in names)
+        pipeline.run(jobs, _chunk_job, embeddings, builder or vectorstore_sink(vs), on_file=on_file, progress=progress)
+
+    if builder is not None:
+        if pipeline.stats.vectors:
+            vs, meta = builder.finish(embeddings)
+            apply_search_params(vs.index, settings.faiss_nprobe, settings.faiss_ef_search)
+        else:
+            builder.store.close()
+
+    if vs is not None and (full_rebuild or not diff.is_empty):
+        index_dir.mkdir(parents=True, exist_ok=True)
+        _save_vectorstore(vs, index_dir, meta)
+        if incremental:
+            _BM25 = _refresh_bm25(vs, ntotal_before, stale, added)
+            _refresh_shards(index_dir, vs, ntotal_before, touched)
+        else:
+            _BM25 = _build_bm25(vs)
+            _SHARDS.clear()
+            _SHARDS.update(_build_shards(vs))
+            save_shards(index_dir, _SHARDS)
+        _BM25.save(_bm25_path())
+        manifest["index"] = next_index_state(state, diff, new_chunks, params)
+        save_manifest(manifest_path, manifest)
+        _INDEX_VERSION = int(manifest["index"]["version"])
+        cache = _retrieval_cache()
+        if cache is not None:
+            # Cached doc ids point into the old index; drop them all in O(1)
+            cache.invalidate()
+    elif vs is not None and not _shards_current(shard_catalog(index_dir), vs.index.ntotal):
+        # Unchanged KB whose shards are missing (e.g. indexed before sharding)
+        _SHARDS.clear()
+        _SHARDS.update(_build_shards(vs))
+        save_shards(index_dir, _SHARDS)
+
+    if vs is not None:
+        _VECTORSTORE = vs
+        _LOADED_GENERATION = vs.docstore.generation
+
+    report: Dict[str, Any] = dict(diff.summary())
+    report.update(
+        full_rebuild=full_rebuild,
+        chunks_embedded=pipeline.stats.vectors,
+        chunks_deleted=len(stale),
+        index=read_index_meta(index_dir),
+        embedding_cache=embeddings.stats() if hasattr(embeddings, "stats") else None,
+        pipeline=pipeline.stats.summary(),
+        index_version=index_state(manifest).get("version", 0),
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return report
+
+
+def build_or_load_faiss(refresh: bool = False) -> FAISS:
+    """
+    Loads FAISS index if (index.faiss AND its docstore) exist.
+    Otherwise (or with refresh=True) syncs it with the KB text files,
+    embedding only files whose content hash changed, and saves locally.
+    """
+    global _VECTORSTORE, _BM25, _INDEX_VERSION, _LOADED_GENERATION
+    index_dir = _index_dir()
+    if _VECTORSTORE is not None and not refresh:
+        if not _generation_changed(index_dir):
+            return _VECTORSTORE
+        # Another process refreshed the index: drop everything derived from the old generation
+        _BM25, _INDEX_VERSION = None, None
+        _SHARDS.clear()
+
+    embeddings = _get_embeddings()
+
+    # An index embedded by another backend can't be queried with this one
+    built_with = index_state(load_manifest(_manifest_path())).get("params", {}).get("embedding_model", _LEGACY_EMBEDDING_MODEL)
+    if built_with != embedding_model_name(embeddings):
+        refresh = True
+
+    # ✅ Only load if BOTH files exist
+    if not refresh and _index_files_exist(index_dir):
+        _VECTORSTORE = _load_vectorstore(index_dir, embeddings, mmap=settings.faiss_mmap)
+        _LOADED_GENERATION = _VECTORSTORE.docstore.generation
+        return _VECTORSTORE
+
+    # ✅ Otherwise build / update incrementally
+    refresh_kb_index()
     return _VECTORSTORE
 
 
 def get_rag_retriever(category: str | None = None):
     vs = build_or_load_faiss()
-    if category and category != "All":
-        return vs.as_retriever(search_kwargs={"k": 5, "filter": {"category": category}})
-    return vs.as_retriever(search_kwargs={"k": 5})
\ No newline at end of file
+    mode = (settings.rag_retrieval_mode or "hybrid").lower()
+    category = category if category and category != "All" else None
+    return HybridRetriever(
+        vectorstore=vs,
+        bm25=get_bm25_index() if mode != "dense" else None,
+        k=5,
+        category=category,
+        shard=get_category_shard(category) if category else None,
+        mode=mode,
+        fetch_k=settings.rag_fetch_k,
+        lexical_margin=settings.rag_lexical_margin,
+        cache=_retrieval_cache(),
+        cache_ttl_seconds=settings.rag_retrieval_cache_ttl_seconds,
+        index_version=kb_index_version(),
+    )
+
+
+def _answer_cache() -> Optional[SemanticAnswerCache]:
+    if not settings.rag_answer_cache_enabled:
+        return None
+    return get_answer_cache(
+        settings.rag_answer_cache_path,
+        max_entries=settings.rag_answer_cache_max_entries,
+        ttl_seconds=settings.rag_answer_cache_ttl_seconds,
+        threshold=settings.rag_answer_cache_threshold,
+    )
+
+
+def answer_with_cache(
+    scope: str,
+    question: str,
+    history: Optional[Sequence[str]],
+    retriever: HybridRetriever,
+    result: RetrievalResult,
+    generate: Callable[[], str],
+    prompt_docs: Optional[Sequence[Document]] = None,
+) -> str:
+    """
+    Returns a cached LLM answer for a near-identical question over the same
+    prompt context and KB version, otherwise calls `generate()` and stores it.
+    `prompt_docs` are the retrieved docs the prompt actually cites, in order
+    (default: all of them); answers are keyed on exactly that list.
+    When retrieval took the lexical fast path there is no query embedding, and
+    the question is matched on its normalized text instead of embedding it here.
+    Follow-ups whose meaning depends on the conversation history bypass the cache.
+    """
+    cache = _answer_cache()
+    doc_ids = [d.id for d in prompt_docs] if prompt_docs is not None else result.doc_ids
+    if cache is None or not doc_ids or depends_on_history(question, history):
+        return generate()
+
+    embedding = result.query_embedding
+    normalized = normalize_query(question)
+    scope = f"{scope}|{embedding_model_name(retriever.vectorstore.embedding_function)}"
+    hit = cache.lookup(scope, embedding, doc_ids, retriever.index_version, question=normalized)
+    if hit is not None:
+        return hit["answer"]
+
+    answer = generate()
+    cache.store(
+        scope, embedding, doc_ids, retriever.index_version, {"answer": answer, "question": question}, question=normalized
+    )
+    return answer
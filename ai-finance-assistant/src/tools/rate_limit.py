@@ -0,0 +1,55 @@
+# src/tools/rate_limit.py
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    rate: tokens added per second
+    capacity: max burst size
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(int(capacity), 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        """
+        Blocks until tokens are available. Returns False if timeout elapsed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,185 @@
+# src/tools/retrieval.py
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .local_embeddings import tokenize
+
+# Bump when the cached retrieval payload changes shape
+RETRIEVAL_CACHE_VERSION = 1
+
+_NORMALIZE_RE = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+_STATS: Counter = Counter()
+_STATS_LOCK = threading.Lock()
+
+
+def _count(path: str) -> None:
+    with _STATS_LOCK:
+        _STATS[path] += 1
+
+
+def retrieval_stats() -> Dict[str, int]:
+    """How many queries took each retrieval path (lexical fast path / hybrid / dense)."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and whitespace insensitive form: 'What is an ETF?' -> 'what is an etf'."""
+    return " ".join(_NORMALIZE_RE.findall((query or "").lower()))
+
+
+@dataclass
+class RetrievalResult:
+    docs: List[Document]
+    doc_ids: List[str]
+    query_embedding: Optional[List[float]]  # None when the lexical fast path answered
+    path: str  # "cache", "lexical", "hybrid" or "dense"
+
+
+def stored_document(vectorstore, doc_id: str) -> Optional[Document]:
+    doc = vectorstore.docstore.search(doc_id)
+    if not isinstance(doc, Document):
+        return None
+    return Document(page_content=doc.page_content, metadata=dict(doc.metadata or {}), id=doc_id)
+
+
+def dense_search(
+    vectorstore,
+    query_vector: List[float],
+    k: int,
+    category: Optional[str] = None,
+    shard=None,
+) -> List[Tuple[str, float]]:
+    """
+    Top-k (doc_id, distance) straight from FAISS. With a category shard the
+    search runs on that sub-index only; without one the category is post-filtered.
+    """
+    index = vectorstore.index
+    if index.ntotal == 0:
+        return []
+    vec = np.asarray([query_vector], dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        import faiss
+
+        faiss.normalize_L2(vec)
+
+    if shard is not None:
+        return shard.search(vec, k)
+
+    fetch = k if not category else min(index.ntotal, k * 4)
+    distances, positions = index.search(vec, fetch)
+    hits: List[Tuple[str, float]] = []
+    for dist, pos in zip(distances[0], positions[0]):
+        if pos < 0:
+            continue
+        doc_id = vectorstore.index_to_docstore_id[int(pos)]
+        if category:
+            doc = vectorstore.docstore.search(doc_id)
+            if not isinstance(doc, Document) or (doc.metadata or {}).get("category") != category:
+                continue
+        hits.append((doc_id, float(dist)))
+        if len(hits) >= k:
+            break
+    return hits
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = 60) -> List[str]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda d: scores[d], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 + dense FAISS retrieval fused with reciprocal rank fusion.
+    When BM25 is decisive (every query term is known, the top hit contains all
+    of them and clearly beats the runner-up) the dense side, and with it the
+    query-embedding round trip, is skipped.
+    """
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 5
+    category: Optional[str] = None
+    shard: Any = None  # CategoryShard for `category`; dense search is routed there instead of filtering
+    mode: str = "hybrid"  # "hybrid", "lexical" or "dense"
+    fetch_k: int = 20
+    lexical_margin: float = 1.5
+    rrf_k: int = 60
+    # Optional CacheNamespace: normalized query -> doc ids (+ query embedding), keyed by index version
+    cache: Any = None
+    cache_ttl_seconds: int = 86400
+    index_version: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def lexical_hits(self, query: str) -> Tuple[List[Tuple[str, float]], bool]:
+        """BM25 top fetch_k and whether they are decisive enough to skip dense search."""
+        scores, terms = self.bm25.scores(query, self.category)
+        hits = self.bm25.top_k(scores, self.fetch_k)
+        if not hits or not terms:
+            return hits, False
+        if len(terms) < len(set(tokenize(query))):
+            return hits, False  # some query words are unknown to the corpus; let embeddings handle them
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        decisive = hits[0][1] >= self.lexical_margin * runner_up and self.bm25.covers_all_terms(hits[0][0], terms)
+        return hits, decisive
+
+    def ranked_ids(self, query: str) -> Tuple[List[str], Optional[List[float]], str]:
+        """Doc ids, the query embedding (if one was computed) and which path produced them."""
+        if self.mode == "dense" or self.bm25 is None:
+            vec = self.vectorstore._embed_query(query)
+            return [d for d, _ in dense_search(self.vectorstore, vec, self.k, self.category, self.shard)], vec, "dense"
+
+        lexical, decisive = self.lexical_hits(query)
+        if self.mode == "lexical" or decisive:
+            return [d for d, _ in lexical[: self.k]], None, "lexical"
+
+        vec = self.vectorstore._embed_query(query)
+        dense = dense_search(self.vectorstore, vec, self.fetch_k, self.category, self.shard)
+        fused = reciprocal_rank_fusion([[d for d, _ in dense], [d for d, _ in lexical]], self.rrf_k)
+        return fused[: self.k], vec, "hybrid"
+
+    def cache_key(self, query: str) -> str:
+        digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.index_version}|{self.mode}|{self.k}|{self.category or '*'}|{digest}"
+
+    def retrieve(self, query: str) -> RetrievalResult:
+        key = self.cache_key(query) if self.cache is not None else None
+        if key is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                docs = [d for d in (stored_document(self.vectorstore, i) for i in hit["doc_ids"]) if d is not None]
+                # A doc id that vanished means the index moved under us; fall through and recompute
+                if len(docs) == len(hit["doc_ids"]):
+                    _count("cache")
+                    return RetrievalResult(docs, list(hit["doc_ids"]), hit.get("embedding"), "cache")
+
+        doc_ids, vec, path = self.ranked_ids(query)
+        _count(path)
+        docs = [d for d in (stored_document(self.vectorstore, i) for i in doc_ids) if d is not None]
+        if vec is not None:
+            vec = [float(x) for x in vec]
+        if key is not None:
+            self.cache.set(key, {"doc_ids": [d.id for d in docs], "embedding": vec}, self.cache_ttl_seconds)
+        return RetrievalResult(docs, [d.id for d in docs], vec, path)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.retrieve(query).docs
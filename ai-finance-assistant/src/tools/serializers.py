@@ -0,0 +1,198 @@
+# src/tools/serializers.py
+from __future__ import annotations
+
+import json
+import re
+import struct
+import sys
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from datetime import date
+from typing import Any, List, Union
+
+# Packed blobs start with MAGIC + one flags byte
+MAGIC = b"FBv1"
+_FLAG_ZLIB = 0x01
+
+# Placeholder keys for lists moved into the binary section
+_F64_REF = "__f64__"
+_DATE_REF = "__date__"
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Shorter float lists aren't worth a separate segment
+_MIN_PACKED_LEN = 4
+
+_U32 = struct.Struct("<I")
+
+
+class Serializer(ABC):
+    name = "base"
+
+    @abstractmethod
+    def dumps(self, value: Any) -> Union[str, bytes]:
+        ...
+
+    @abstractmethod
+    def loads(self, raw: Union[str, bytes]) -> Any:
+        ...
+
+
+class JSONSerializer(Serializer):
+    """Plain JSON text (the original storage format)."""
+
+    name = "json"
+
+    def dumps(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def loads(self, raw: Union[str, bytes]) -> Any:
+        return decode_value(raw)
+
+
+def _is_float_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) >= _MIN_PACKED_LEN
+        and all(type(x) is float for x in value)
+    )
+
+
+def _is_date_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) >= _MIN_PACKED_LEN
+        and all(isinstance(x, str) and _DATE_RE.match(x) for x in value)
+    )
+
+
+class PackedSerializer(Serializer):
+    """
+    Binary format for quote-like payloads:
+      MAGIC | flags | body
+      body = u32 len | JSON skeleton | segments
+      segment = u32 count | u8 width | count * width bytes
+        float lists -> float64 LE, referenced as {"__f64__": i}
+        YYYY-MM-DD lists -> int32 LE day ordinals, referenced as {"__date__": i}
+    Float lists (history_5d and longer price histories) and date lists
+    (history_dates) move into packed segments; everything else stays JSON.
+    With compress=True the body is zlib-compressed when that actually makes
+    it smaller.
+
+    Every serializer decodes with decode_value(), which reads both formats,
+    so switching serializers never strands existing rows.
+    """
+
+    name = "packed"
+
+    def __init__(self, compress: bool = True, level: int = 6, min_compress_bytes: int = 256):
+        self.compress = compress
+        self.level = level
+        self.min_compress_bytes = min_compress_bytes
+
+    def _extract(self, value: Any, segments: List[array]) -> Any:
+        if _is_float_list(value):
+            segments.append(array("d", value))
+            return {_F64_REF: len(segments) - 1}
+        if _is_date_list(value):
+            try:
+                segments.append(array("i", (date.fromisoformat(x).toordinal() for x in value)))
+                return {_DATE_REF: len(segments) - 1}
+            except ValueError:
+                pass
+        if isinstance(value, dict):
+            return {k: self._extract(v, segments) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._extract(v, segments) for v in value]
+        return value
+
+    def dumps(self, value: Any) -> bytes:
+        segments: List[array] = []
+        skeleton = json.dumps(self._extract(value, segments), separators=(",", ":")).encode("utf-8")
+
+        parts = [_U32.pack(len(skeleton)), skeleton]
+        for seg in segments:
+            if sys.byteorder != "little":
+                seg = array(seg.typecode, seg)
+                seg.byteswap()
+            parts.append(_U32.pack(len(seg)))
+            parts.append(bytes([seg.itemsize]))
+            parts.append(seg.tobytes())
+        body = b"".join(parts)
+
+        flags = 0
+        if self.compress and len(body) >= self.min_compress_bytes:
+            packed = zlib.compress(body, self.level)
+            if len(packed) < len(body):
+                body = packed
+                flags |= _FLAG_ZLIB
+        return MAGIC + bytes([flags]) + body
+
+    def loads(self, raw: Union[str, bytes]) -> Any:
+        return decode_value(raw)
+
+
+def _restore(value: Any, segments: List[bytes]) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and _F64_REF in value:
+            return _unpack(segments[value[_F64_REF]], "d")
+        if len(value) == 1 and _DATE_REF in value:
+            return [date.fromordinal(x).isoformat() for x in _unpack(segments[value[_DATE_REF]], "i")]
+        return {k: _restore(v, segments) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore(v, segments) for v in value]
+    return value
+
+
+def _unpack(raw: bytes, typecode: str) -> list:
+    arr = array(typecode)
+    arr.frombytes(raw)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tolist()
+
+
+def decode_value(raw: Union[str, bytes]) -> Any:
+    """
+    Decodes any stored format: JSON text/bytes or a packed blob.
+    """
+    if isinstance(raw, str):
+        return json.loads(raw)
+    raw = bytes(raw)
+    if not raw.startswith(MAGIC):
+        return json.loads(raw)
+
+    flags = raw[len(MAGIC)]
+    body = raw[len(MAGIC) + 1:]
+    if flags & _FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    (n,) = _U32.unpack_from(body, 0)
+    pos = _U32.size
+    skeleton = json.loads(body[pos:pos + n])
+    pos += n
+
+    # Segments are sliced lazily; the skeleton placeholder says how to decode each
+    segments: List[bytes] = []
+    while pos < len(body):
+        (count,) = _U32.unpack_from(body, pos)
+        pos += _U32.size
+        width = body[pos]
+        pos += 1
+        segments.append(body[pos:pos + width * count])
+        pos += width * count
+
+    return _restore(skeleton, segments)
+
+
+def get_serializer(name: Union[str, Serializer, None]) -> Serializer:
+    if isinstance(name, Serializer):
+        return name
+    if name in (None, "json"):
+        return JSONSerializer()
+    if name == "packed":
+        return PackedSerializer(compress=False)
+    if name == "packed+zlib":
+        return PackedSerializer(compress=True)
+    raise ValueError(f"Unknown cache serializer: {name}")
@@ -0,0 +1,91 @@
+# src/tools/singleflight.py
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        if not self.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for in-flight request")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight:
+    """
+    In-process request coalescing.
+    Concurrent callers for the same key share one in-flight call: the first
+    caller (leader) does the work, everyone else waits for its result.
+
+    Counters:
+      issued: calls actually executed by a leader
+      coalesced: callers that piggy-backed on an in-flight call
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._issued = 0
+        self._coalesced = 0
+
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        """
+        Returns (call, is_leader). The leader must call finish() exactly once.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._issued += 1
+            return call, True
+
+    def finish(
+        self,
+        key: str,
+        call: _Call,
+        value: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.value = value
+        call.error = error
+        call.done.set()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Runs fn() once per key across concurrent callers.
+        Returns (value, shared) where shared=True means the value came from another caller.
+        """
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait(timeout), True
+        try:
+            value = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, value=value)
+        return value, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "issued": self._issued,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,193 @@
+# src/tools/vector_shards.py
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from .docstore import MmapDocstore
+from .faiss_index import StreamingIndexBuilder, read_index, stores_exact_vectors
+from .kb_pipeline import batched
+
+SHARDS_DIRNAME = "shards"
+
+
+def _slug(category: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_") or "uncategorized"
+
+
+def iter_chunks(vectorstore, categories: Optional[Set[str]] = None) -> Iterator[Tuple[str, str, str]]:
+    """(doc_id, text, category) for every indexed chunk (of `categories`, if given), in position order."""
+    store = vectorstore.docstore
+    if isinstance(store, MmapDocstore):
+        documents = store.iter_documents(categories)
+    else:
+        ids = (vectorstore.index_to_docstore_id[pos] for pos in range(vectorstore.index.ntotal))
+        documents = ((doc_id, store.search(doc_id)) for doc_id in ids)
+    for doc_id, doc in documents:
+        if isinstance(doc, Document):
+            category = (doc.metadata or {}).get("category") or "Uncategorized"
+            if categories is None or category in categories:
+                yield doc_id, doc.page_content, category
+
+
+def iter_positions(vectorstore, categories: Optional[Set[str]] = None) -> Iterator[Tuple[str, int, str]]:
+    """(doc_id, FAISS position, category) for every indexed chunk (of `categories`, if given), no texts read."""
+    store = vectorstore.docstore
+    if isinstance(store, MmapDocstore):
+        rows = store.indexed_chunks()
+    else:
+        rows = []
+        for pos in range(vectorstore.index.ntotal):
+            doc_id = vectorstore.index_to_docstore_id[pos]
+            doc = store.search(doc_id)
+            rows.append((pos, doc_id, (doc.metadata or {}).get("category") if isinstance(doc, Document) else None))
+    for pos, doc_id, category in rows:
+        category = category or "Uncategorized"
+        if categories is None or category in categories:
+            yield doc_id, int(pos), category
+
+
+class CategoryShard:
+    """One category's vectors in their own exact index; positions map to global docstore ids."""
+
+    def __init__(self, category: str, index, ids: List[str]):
+        self.category = category
+        self.index = index
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, vec: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if not self.ids:
+            return []
+        distances, positions = self.index.search(vec, min(k, len(self.ids)))
+        return [(self.ids[int(p)], float(d)) for d, p in zip(distances[0], positions[0]) if p >= 0]
+
+
+def build_category_shards(
+    vectorstore,
+    embed_texts: Callable[[List[str]], Any],
+    new_builder: Optional[Callable[[], Any]] = None,
+    categories: Optional[Set[str]] = None,
+    block_size: int = 512,
+) -> Dict[str, CategoryShard]:
+    """
+    Partition the KB by chunk category; build/refresh-time work only. When
+    the global index keeps raw vectors (flat, HNSW-flat) they are copied out
+    of it. Otherwise (SQ/PQ codes are lossy, IVF needs a direct map) they
+    come from `embed_texts`, the content-hash embedding cache in practice.
+    `new_builder` returns a StreamingIndexBuilder-like object per category
+    (default: exact flat); vectors are fed to it block by block. With
+    `categories` only those shards are built (categories left without chunks
+    are simply absent from the result).
+    """
+    index = vectorstore.index
+    if stores_exact_vectors(index):
+        chunks = iter_positions(vectorstore, categories)
+
+        def vectors_of(positions: List[int]) -> np.ndarray:
+            return index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+    else:
+        chunks = iter_chunks(vectorstore, categories)
+        normalize = getattr(vectorstore, "_normalize_L2", False)
+
+        def vectors_of(texts: List[str]) -> np.ndarray:
+            vectors = np.asarray(embed_texts(texts), dtype=np.float32)
+            if normalize:
+                faiss.normalize_L2(vectors)
+            return vectors
+
+    new_builder = new_builder or (lambda: StreamingIndexBuilder("flat"))
+    builders: Dict[str, Any] = {}
+    ids: Dict[str, List[str]] = {}
+    # Rows are (doc_id, position or text, category)
+    for block in batched(chunks, block_size):
+        vectors = vectors_of([source for _, source, _ in block])
+        rows: Dict[str, List[int]] = {}
+        for i, (_, _, category) in enumerate(block):
+            rows.setdefault(category, []).append(i)
+        for category, idx in rows.items():
+            if category not in builders:
+                builders[category] = new_builder()
+                ids[category] = []
+            builders[category].add(vectors[idx])
+            ids[category].extend(block[i][0] for i in idx)
+
+    shards: Dict[str, CategoryShard] = {}
+    for category in sorted(builders):
+        sub, _ = builders.pop(category).finish()
+        shards[category] = CategoryShard(category, sub, ids[category])
+    return shards
+
+
+def save_shards(index_dir: Path, shards: Dict[str, CategoryShard]) -> None:
+    """Writes shards/<slug>.faiss plus shards/shards.json, replacing any previous set."""
+    out = Path(index_dir) / SHARDS_DIRNAME
+    tmp = Path(index_dir) / (SHARDS_DIRNAME + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta: Dict[str, Dict] = {}
+    for category, shard in shards.items():
+        fname = f"{_slug(category)}.faiss"
+        faiss.write_index(shard.index, str(tmp / fname))
+        meta[category] = {"file": fname, "count": len(shard), "ids": shard.ids}
+    (tmp / "shards.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+
+
+def update_shards(index_dir: Path, shards: Dict[str, Optional[CategoryShard]]) -> None:
+    """
+    Replaces only the given categories (None or an empty shard drops one) and
+    leaves every other shard file alone. Rewritten shards get a new file name
+    and shards.json is swapped last, so readers see the old or the new set.
+    """
+    out = Path(index_dir) / SHARDS_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+    meta = shard_catalog(index_dir)
+    obsolete: List[str] = []
+    for category, shard in shards.items():
+        old = meta.pop(category, None)
+        if old is not None:
+            obsolete.append(old["file"])
+        if shard is None or not len(shard):
+            continue
+        rev = (old or {}).get("rev", 0) + 1
+        fname = f"{_slug(category)}-{rev}.faiss"
+        faiss.write_index(shard.index, str(out / fname))
+        meta[category] = {"file": fname, "count": len(shard), "ids": shard.ids, "rev": rev}
+
+    tmp = out / "shards.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, out / "shards.json")
+    for fname in obsolete:
+        (out / fname).unlink(missing_ok=True)
+
+
+def shard_catalog(index_dir: Path) -> Dict[str, Dict]:
+    path = Path(index_dir) / SHARDS_DIRNAME / "shards.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load_shard(
+    index_dir: Path, category: str, catalog: Optional[Dict[str, Dict]] = None, mmap: bool = False
+) -> Optional[CategoryShard]:
+    catalog = shard_catalog(index_dir) if catalog is None else catalog
+    entry = catalog.get(category)
+    if entry is None:
+        return None
+    index = read_index(Path(index_dir) / SHARDS_DIRNAME / entry["file"], mmap=mmap)
+    return CategoryShard(category, index, list(entry["ids"]))
@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Tests import the app the same way the scripts do: `from src... import ...`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_community.vectorstores import FAISS  # noqa: E402
+
+from src.config import settings  # noqa: E402
+from src.tools import circuit_breaker, market_data, rag  # noqa: E402
+from src.tools.bm25 import BM25Index  # noqa: E402
+from src.tools.cache import SQLiteTTLCache  # noqa: E402
+from src.tools.local_embeddings import HashingEmbeddings  # noqa: E402
+from src.tools.rate_limit import TokenBucket  # noqa: E402
+from src.tools.retrieval import HybridRetriever  # noqa: E402
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the circuit breaker."""
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def quote_cache(tmp_path, monkeypatch):
+    """Throwaway quote cache + history store; breakers open after 3 failures, no throttling."""
+    monkeypatch.setattr(settings, "market_history_dir", tmp_path / "history")
+    monkeypatch.setattr(settings, "market_breaker_failure_threshold", 3)
+    monkeypatch.setattr(market_data, "_RATE_LIMITER", TokenBucket(rate=1000, capacity=1000))
+    return SQLiteTTLCache(tmp_path / "cache.sqlite3")
+
+
+_ARTICLES = {
+    "01_etf.txt": ("ETFs", "An ETF is an exchange traded fund that holds a basket of stocks or bonds."),
+    "02_index.txt": ("ETFs", "Index funds track a market index such as the S&P 500 at very low cost."),
+    "03_roth.txt": ("Retirement", "A Roth IRA is funded with after-tax dollars and grows tax free."),
+    "04_401k.txt": ("Retirement", "A 401k plan lets employees defer salary, often with an employer match."),
+    "05_munis.txt": ("Tax", "Municipal bond interest is usually exempt from federal income tax."),
+}
+
+
+def _write_article(kb_dir, name, category, body):
+    (kb_dir / name).write_text(f"Title: {name}\nCategory: {category}\n\n{body}\n", encoding="utf-8")
+
+
+@pytest.fixture
+def write_article():
+    return _write_article
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    """Five-article KB with a local embedder and an empty index dir; returns the articles dir."""
+    kb_dir = tmp_path / "knowledge_base" / "sample_articles"
+    kb_dir.mkdir(parents=True)
+    for name, (category, body) in _ARTICLES.items():
+        _write_article(kb_dir, name, category, body)
+
+    for key, value in {
+        "kb_dir": kb_dir,
+        "faiss_index_dir": tmp_path / "knowledge_base" / "faiss_index",
+        "embedding_backend": "local",
+        "local_embedding_dim": 128,
+        "embedding_cache_enabled": True,
+        "embedding_cache_path": tmp_path / "embeddings.sqlite3",
+        "faiss_index_type": "flat",
+        "faiss_mmap": False,
+        "kb_build_workers": 1,
+        "rag_retrieval_cache_enabled": False,
+    }.items():
+        monkeypatch.setattr(settings, key, value)
+    monkeypatch.setattr(rag, "_VECTORSTORE", None)
+    monkeypatch.setattr(rag, "_BM25", None)
+    monkeypatch.setattr(rag, "_SHARDS", {})
+    monkeypatch.setattr(rag, "_INDEX_VERSION", None)
+    monkeypatch.setattr(rag, "_LOADED_GENERATION", None)
+    return kb_dir
+
+
+_DOCS = [
+    ("d1", "Zebra bonds are striped municipal bonds issued by zoos.", "Bonds"),
+    ("d2", "Municipal bonds pay interest that is often exempt from federal tax.", "Bonds"),
+    ("d3", "An ETF is an exchange traded fund holding a basket of stocks.", "ETFs"),
+    ("d4", "Index funds track a market index at low cost.", "ETFs"),
+    ("d5", "Treasury bonds are backed by the US government.", "Bonds"),
+]
+
+
+class _CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__(dim=256)
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def retriever():
+    """Hybrid retriever over five small in-memory docs; counts query embeddings."""
+    embeddings = _CountingEmbeddings()
+    vs = FAISS.from_texts(
+        [text for _, text, _ in _DOCS],
+        embeddings,
+        metadatas=[{"category": category} for _, _, category in _DOCS],
+        ids=[doc_id for doc_id, _, _ in _DOCS],
+    )
+    bm25 = BM25Index.build(_DOCS)
+    return HybridRetriever(vectorstore=vs, bm25=bm25, k=3, fetch_k=5)
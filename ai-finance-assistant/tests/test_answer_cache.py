@@ -0,0 +1,38 @@
+from src.config import settings
+from src.tools import rag
+
+
+def test_lexical_answers_are_cached_without_embedding(retriever, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "rag_answer_cache_enabled", True)
+    monkeypatch.setattr(settings, "rag_answer_cache_path", tmp_path / "answers.sqlite3")
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "Striped munis."
+
+    for question in ("zebra bonds", "Zebra bonds?"):
+        result = retriever.retrieve(question)
+        assert result.path == "lexical"
+        assert rag.answer_with_cache("rag_qa", question, [], retriever, result, generate) == "Striped munis."
+
+    assert len(calls) == 1
+    assert retriever.vectorstore.embedding_function.queries == 0
+
+
+def test_answers_are_keyed_on_the_ordered_prompt_docs(retriever, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "rag_answer_cache_enabled", True)
+    monkeypatch.setattr(settings, "rag_answer_cache_path", tmp_path / "answers.sqlite3")
+    result = retriever.retrieve("zebra bonds")
+    assert len(result.docs) >= 3
+    calls = []
+
+    def answer(prompt_docs):
+        return rag.answer_with_cache("rag_qa", "zebra bonds", [], retriever, result, lambda: calls.append(1) or "A", prompt_docs)
+
+    answer(result.docs[:2])
+    answer(result.docs[:2])
+    assert len(calls) == 1
+    # A different citation order ([1] <-> [2]) is a different prompt
+    answer(result.docs[:2][::-1])
+    assert len(calls) == 2
@@ -0,0 +1,20 @@
+import time
+
+from src.tools.cache import SQLiteTTLCache
+
+
+def test_sweep_evicts_just_enough_oldest_rows(tmp_path, monkeypatch):
+    cache = SQLiteTTLCache(tmp_path / "cache.sqlite3", memory_max_entries=0)
+    start = time.time() - 1000
+    for i in range(400):
+        monkeypatch.setattr("src.tools.cache.time.time", lambda i=i: start + i)
+        cache.set(f"k{i:03d}", {"blob": "x" * 1000}, ttl_seconds=3600)
+    monkeypatch.undo()
+
+    cache.max_db_bytes = cache.db_bytes() // 2
+    stats = cache.sweep()
+
+    # Sized from the row count up front: roughly half goes, not everything
+    assert 150 <= stats["evicted"] <= 250
+    assert cache.get("k000") is None
+    assert cache.get("k399") is not None
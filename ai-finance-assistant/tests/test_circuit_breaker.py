@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+from src.tools import market_data
+from src.tools.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.tools.quote_providers import QuoteProvider
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # trial already in flight
+
+
+def test_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_half_open_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert breaker.state == "open"
+
+
+def test_released_trial_can_be_retried(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+# ---------------------------
+# Breaker as used by fetch_quotes
+# ---------------------------
+
+
+class _Ticker:
+    def __init__(self, provider):
+        self._provider = provider
+
+    @property
+    def fast_info(self):
+        self._provider.maybe_fail()
+        return {}
+
+    def history(self, period="1mo", interval="1d", auto_adjust=False):
+        self._provider.maybe_fail()
+        return pd.DataFrame()
+
+
+class _FakeProvider(QuoteProvider):
+    """Healthy provider that knows no symbols, or a dead one that raises network errors."""
+
+    def __init__(self, name, down=False):
+        self.name = name
+        self.down = down
+
+    def maybe_fail(self):
+        if self.down:
+            raise ConnectionError("connection reset")
+
+    def ticker(self, symbol):
+        return _Ticker(self)
+
+    def download(self, symbols, interval, **window):
+        self.maybe_fail()
+        return {}
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_unknown_symbols_do_not_open_the_breaker(quote_cache, batch):
+    provider = _FakeProvider(f"test-typos-{batch}")
+    for symbols in (["TYPO0", "TYPO1", "TYPO2"], ["TYPO3", "TYPO4", "TYPO5"]):
+        quotes = market_data.fetch_quotes(symbols, quote_cache, ttl_seconds=60, batch=batch, provider=provider)
+        assert {q["source"] for q in quotes.values()} == {"error"}
+    assert market_data.quote_fetch_stats(provider)["breaker_state"] == "closed"
+    # ... but they are negative-cached
+    again = market_data.fetch_quotes(["TYPO0"], quote_cache, ttl_seconds=60, batch=batch, provider=provider)
+    assert again["TYPO0"]["cache_hit"] is True
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_transport_failures_open_the_breaker(quote_cache, batch):
+    provider = _FakeProvider(f"test-outage-{batch}", down=True)
+    market_data.fetch_quotes(["AAA", "BBB", "CCC"], quote_cache, ttl_seconds=60, batch=batch, provider=provider)
+    assert market_data.quote_fetch_stats(provider)["breaker_state"] == "open"
+
+    quotes = market_data.fetch_quotes(["DDD"], quote_cache, ttl_seconds=60, batch=batch, provider=provider)
+    assert quotes["DDD"]["source"] == "unavailable"
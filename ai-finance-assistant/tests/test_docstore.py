@@ -0,0 +1,44 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from src.config import settings
+from src.tools import docstore, rag
+from src.tools.docstore import MmapDocstore, PositionMap, write_docstore
+from src.tools.local_embeddings import HashingEmbeddings
+
+
+def _doc(i):
+    return Document(page_content=f"chunk {i} " + "x" * 100, metadata={"category": "A"})
+
+
+def test_reader_keeps_its_generation_across_a_refresh(kb, write_article):
+    rag.refresh_kb_index()
+    reader = rag._load_vectorstore(rag._index_dir(), rag._get_embeddings())
+
+    # Two refreshes elsewhere: the reader's generation gets pruned from disk
+    (kb / "01_etf.txt").unlink()
+    rag.refresh_kb_index()
+    write_article(kb, "03_roth.txt", "Retirement", "A Roth IRA grows tax free. Contributions are not deductible.")
+    rag.refresh_kb_index()
+    assert not (rag._index_dir() / "docstore" / "docs-1.db").exists()
+
+    ntotal = reader.index.ntotal
+    ids = [reader.index_to_docstore_id[pos] for pos in range(ntotal)]
+    texts = [reader.docstore.search(doc_id).page_content for doc_id in ids]
+    expected = HashingEmbeddings(dim=settings.local_embedding_dim).embed_documents(texts)
+    assert np.allclose(reader.index.reconstruct_n(0, ntotal), np.asarray(expected, dtype=np.float32), atol=1e-6)
+
+
+def test_compaction_leaves_the_published_blob_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(docstore, "_COMPACT_MIN_DEAD_BYTES", 0)
+    write_docstore(tmp_path, 1, ((f"d{i}", _doc(i)) for i in range(10))).close()
+    reader = MmapDocstore(tmp_path, 1, writable=False)
+
+    store = reader.fork(2)
+    store.delete([f"d{i}" for i in range(8)])
+    store.flush({0: "d8", 1: "d9"})
+
+    assert store.blob_path != reader.blob_path
+    assert store.search("d9").page_content.startswith("chunk 9 ")
+    assert reader.search("d3").page_content.startswith("chunk 3 ")
+    assert len(PositionMap(reader)) == 10
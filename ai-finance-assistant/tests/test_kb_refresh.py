@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.config import settings
+from src.tools import rag
+from src.tools.kb_manifest import index_state, load_manifest
+from src.tools.local_embeddings import HashingEmbeddings
+
+
+def _assert_aligned(vs):
+    """Index positions, docstore and manifest all describe the same chunks."""
+    embedder = HashingEmbeddings(dim=settings.local_embedding_dim)
+    ntotal = vs.index.ntotal
+    ids = [vs.index_to_docstore_id[pos] for pos in range(ntotal)]
+    docs = [vs.docstore.search(doc_id) for doc_id in ids]
+
+    # Every position holds the vector of the text the docstore maps it to
+    expected = np.asarray(embedder.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+    assert np.allclose(vs.index.reconstruct_n(0, ntotal), expected, atol=1e-6)
+
+    files = index_state(load_manifest(rag._manifest_path()))["files"]
+    assert sorted(ids) == sorted(i for f in files.values() for i in f["chunk_ids"])
+
+
+def test_full_build_is_aligned(kb):
+    report = rag.refresh_kb_index()
+    assert report["full_rebuild"] and report["added"] == 5
+    _assert_aligned(rag.build_or_load_faiss())
+
+
+def test_incremental_refresh_stays_aligned(kb, write_article):
+    rag.refresh_kb_index()
+
+    (kb / "04_401k.txt").unlink()
+    write_article(kb, "03_roth.txt", "Retirement", "A Roth IRA is funded with after-tax dollars. Withdrawals after 59.5 are tax free.")
+    write_article(kb, "06_hsa.txt", "Healthcare", "A health savings account pairs with a high deductible health plan.")
+
+    report = rag.refresh_kb_index()
+    assert not report["full_rebuild"]
+    assert (report["added"], report["changed"], report["removed"]) == (1, 1, 1)
+    assert report["chunks_embedded"] == 2
+    assert report["chunks_deleted"] == 2
+    _assert_aligned(rag.build_or_load_faiss())
+
+    # Same picture after a cold start from disk
+    rag._VECTORSTORE, rag._BM25, rag._INDEX_VERSION = None, None, None
+    rag._SHARDS.clear()
+    _assert_aligned(rag.build_or_load_faiss())
+
+
+def test_unchanged_kb_is_a_no_op(kb):
+    first = rag.refresh_kb_index()
+    second = rag.refresh_kb_index()
+    assert second["chunks_embedded"] == 0
+    assert second["index_version"] == first["index_version"]
@@ -0,0 +1,94 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.tools.market_calendar import (
+    EXCHANGE_TZ,
+    adaptive_ttl,
+    early_closes,
+    holidays,
+    is_session_open,
+    is_trading_day,
+    quote_ttl_seconds,
+    session_bounds,
+)
+
+
+def _ny(*args) -> datetime:
+    return datetime(*args, tzinfo=EXCHANGE_TZ)
+
+
+@pytest.mark.parametrize(
+    "day",
+    [
+        date(2026, 1, 1),    # New Year's Day
+        date(2026, 1, 19),   # MLK Day
+        date(2026, 4, 3),    # Good Friday
+        date(2026, 6, 19),   # Juneteenth
+        date(2026, 7, 3),    # Independence Day (Saturday) observed on Friday
+        date(2026, 11, 26),  # Thanksgiving
+        date(2026, 12, 25),  # Christmas
+        date(2027, 6, 18),   # Juneteenth (Saturday) observed on Friday
+    ],
+)
+def test_holidays(day):
+    assert day in holidays(day.year)
+    assert not is_trading_day(day)
+
+
+def test_new_year_on_saturday_is_not_observed_the_friday_before():
+    assert date(2021, 12, 31) not in holidays(2021)
+    assert date(2021, 12, 31) not in holidays(2022)
+    assert is_trading_day(date(2021, 12, 31))
+
+
+def test_early_closes():
+    assert early_closes(2026) == {date(2026, 11, 27), date(2026, 12, 24)}  # July 3 is the observed holiday
+    assert date(2025, 7, 3) in early_closes(2025)
+    _, close = session_bounds(date(2026, 11, 27))
+    assert (close.hour, close.minute) == (13, 0)
+    assert not is_session_open(_ny(2026, 11, 27, 13, 30))
+
+
+def test_intraday_ttl_in_session():
+    assert adaptive_ttl("intraday", 60, _ny(2026, 10, 14, 10, 0)) == 60
+    # Never past the close, never under the floor
+    assert adaptive_ttl("intraday", 60, _ny(2026, 10, 14, 15, 59, 45)) == 30
+
+
+def test_intraday_ttl_settle_window_after_close():
+    assert adaptive_ttl("intraday", 60, _ny(2026, 10, 14, 16, 5)) == 15 * 60
+    assert adaptive_ttl("intraday", 60, _ny(2026, 11, 27, 13, 10)) == 10 * 60  # early close
+
+
+def test_intraday_ttl_over_the_weekend():
+    # Friday evening -> Monday 09:30
+    assert adaptive_ttl("intraday", 60, _ny(2026, 10, 16, 18, 0)) == (2 * 24 + 15) * 3600 + 30 * 60
+
+
+def test_intraday_ttl_on_a_holiday():
+    # Thanksgiving noon -> Friday 09:30
+    assert adaptive_ttl("intraday", 60, _ny(2026, 11, 26, 12, 0)) == 21 * 3600 + 30 * 60
+
+
+def test_intraday_ttl_after_an_early_close():
+    # Day after Thanksgiving, after 13:00 + settle -> Monday 09:30
+    now = _ny(2026, 11, 27, 14, 0)
+    assert adaptive_ttl("intraday", 60, now) == (2 * 24 + 19) * 3600 + 30 * 60
+
+
+def test_daily_and_market_cap_ttls():
+    now = _ny(2026, 10, 14, 10, 0)
+    assert adaptive_ttl("daily", 60, now) == 6 * 3600 + 20 * 60
+    assert adaptive_ttl("market_cap", 60, now) == 3600
+    assert adaptive_ttl("daily", 60, _ny(2026, 11, 27, 10, 0)) == 3 * 3600 + 20 * 60
+
+
+def test_quote_ttl_follows_the_most_volatile_part():
+    assert quote_ttl_seconds(60, _ny(2026, 10, 14, 10, 0)) == 60
+    assert quote_ttl_seconds(60, _ny(2026, 10, 16, 18, 0)) == adaptive_ttl("intraday", 60, _ny(2026, 10, 16, 18, 0))
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        adaptive_ttl("dividends")
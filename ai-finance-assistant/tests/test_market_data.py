@@ -0,0 +1,51 @@
+import pandas as pd
+
+from src.tools import market_data
+from src.tools.quote_providers import QuoteProvider
+
+
+class _CountingBucket:
+    def __init__(self):
+        self.tokens = 0
+
+    def acquire(self, tokens=1.0):
+        self.tokens += tokens
+
+
+class _Ticker:
+    def __init__(self, calls):
+        self.calls = calls
+
+    @property
+    def fast_info(self):
+        self.calls.append("fast_info")
+        return {}
+
+    def history(self, period="1mo", interval="1d", auto_adjust=False):
+        self.calls.append(f"history:{interval}")
+        return pd.DataFrame()
+
+
+class _EmptyProvider(QuoteProvider):
+    name = "test-empty"
+
+    def __init__(self):
+        self.calls = []
+
+    def ticker(self, symbol):
+        return _Ticker(self.calls)
+
+    def download(self, symbols, interval, **window):
+        return {}
+
+
+def test_every_provider_request_takes_a_token(monkeypatch):
+    bucket = _CountingBucket()
+    monkeypatch.setattr(market_data, "_RATE_LIMITER", bucket)
+    provider = _EmptyProvider()
+
+    payload = market_data._fetch_one_safe(provider, "NOPE")
+
+    assert payload["source"] == "error"
+    assert provider.calls == ["fast_info", "history:1m", "history:1d"]
+    assert bucket.tokens == len(provider.calls)
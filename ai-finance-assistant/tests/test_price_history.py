@@ -0,0 +1,91 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tools import price_history
+from src.tools.price_history import BAR_DTYPE, PriceHistoryStore, bar_dates, bars_from_frame
+
+_DAY = 86400
+
+
+def _bars(start_ts, closes):
+    bars = np.zeros(len(closes), dtype=BAR_DTYPE)
+    bars["ts"] = [start_ts + i * _DAY for i in range(len(closes))]
+    bars["close"] = closes
+    bars["volume"] = 100.0
+    return bars
+
+
+def test_append_only_adds_newer_bars(tmp_path):
+    store = PriceHistoryStore(tmp_path)
+    assert store.append("aapl", "1d", _bars(0, [1.0, 2.0, 3.0])) == 3
+    # Overlapping download: only the two bars after the last stored one are new
+    assert store.append("AAPL", "1d", _bars(_DAY, [2.0, 3.0, 4.0, 5.0])) == 2
+
+    bars = store.read("AAPL", "1d")
+    assert list(bars["close"]) == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert list(np.diff(bars["ts"])) == [_DAY] * 4
+    assert store.last_timestamp("AAPL", "1d") == 4 * _DAY
+
+
+def test_newest_bar_is_overwritten_in_place(tmp_path):
+    store = PriceHistoryStore(tmp_path)
+    store.append("MSFT", "1m", _bars(0, [10.0, 11.0]))
+    # Same ts as the stored tail (session still open): updated close, nothing appended
+    assert store.append("MSFT", "1m", _bars(_DAY, [11.5])) == 0
+
+    bars = store.read("MSFT", "1m")
+    assert len(bars) == 2
+    assert list(bars["close"]) == [10.0, 11.5]
+
+
+def test_older_bars_are_never_rewritten(tmp_path):
+    store = PriceHistoryStore(tmp_path)
+    store.append("SPY", "1d", _bars(0, [1.0, 2.0, 3.0]))
+    assert store.append("SPY", "1d", _bars(0, [9.0])) == 0
+    assert list(store.read("SPY", "1d")["close"]) == [1.0, 2.0, 3.0]
+
+
+def test_duplicate_timestamps_in_a_batch_keep_the_last(tmp_path):
+    store = PriceHistoryStore(tmp_path)
+    bars = np.concatenate([_bars(0, [1.0]), _bars(0, [1.5]), _bars(_DAY, [2.0])])
+    assert store.append("QQQ", "1d", bars) == 2
+    assert list(store.read("QQQ", "1d")["close"]) == [1.5, 2.0]
+
+
+def test_read_last_n_and_missing_symbol(tmp_path):
+    store = PriceHistoryStore(tmp_path)
+    store.append("IBM", "1d", _bars(0, [1.0, 2.0, 3.0, 4.0]))
+    assert list(store.read("IBM", "1d", last_n=2)["close"]) == [3.0, 4.0]
+    assert len(store.read("NOPE", "1d")) == 0
+    assert store.last_timestamp("NOPE", "1d") is None
+    assert store.symbols("1d") == ["IBM"]
+
+
+def test_bars_from_frame_keeps_exchange_dates():
+    idx = pd.DatetimeIndex(["2026-10-14", "2026-10-15", "2026-10-16"]).tz_localize("America/New_York")
+    frame = pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": [1.0, None, 3.0], "Volume": 10}, index=idx)
+    bars = bars_from_frame(frame)
+    assert list(bars["close"]) == [1.0, 3.0]
+    assert bar_dates(bars) == ["2026-10-14", "2026-10-16"]
+
+
+def _append_all(root, start):
+    store = PriceHistoryStore(root)
+    for ts in range(start, 2000, 4):
+        store.append("AAA", "1d", _bars(ts, [float(ts)]))
+
+
+@pytest.mark.skipif(price_history.fcntl is None, reason="file locks need fcntl")
+def test_appends_from_several_processes_stay_sorted(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_append_all, args=(tmp_path, start)) for start in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    ts = PriceHistoryStore(tmp_path).read("AAA", "1d")["ts"]
+    assert len(ts) and (np.diff(ts) > 0).all()
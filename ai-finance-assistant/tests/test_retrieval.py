@@ -0,0 +1,45 @@
+from src.tools.retrieval import normalize_query
+
+
+def test_decisive_bm25_hit_skips_the_embedding(retriever):
+    result = retriever.retrieve("zebra bonds")
+    assert result.path == "lexical"
+    assert result.doc_ids[0] == "d1"
+    assert result.query_embedding is None
+    assert retriever.vectorstore.embedding_function.queries == 0
+
+
+def test_unknown_query_words_go_hybrid(retriever):
+    result = retriever.retrieve("zebra bonds volatility")
+    assert result.path == "hybrid"
+    assert result.query_embedding is not None
+    assert retriever.vectorstore.embedding_function.queries == 1
+
+
+def test_close_bm25_scores_go_hybrid(retriever):
+    # Several docs match "bonds" about equally well, so BM25 alone isn't trusted
+    assert retriever.retrieve("municipal bonds").path == "hybrid"
+
+
+def test_top_hit_missing_a_term_goes_hybrid(retriever):
+    hits, decisive = retriever.lexical_hits("zebra tax")
+    assert {d for d, _ in hits} >= {"d1", "d2"}
+    assert not decisive
+
+
+def test_forced_modes(retriever):
+    retriever.mode = "dense"
+    assert retriever.retrieve("zebra bonds").path == "dense"
+    retriever.mode = "lexical"
+    assert retriever.retrieve("zebra bonds volatility").path == "lexical"
+
+
+def test_category_filter(retriever):
+    retriever.category = "ETFs"
+    result = retriever.retrieve("index fund basket of stocks")
+    assert result.doc_ids and all(d in ("d3", "d4") for d in result.doc_ids)
+
+
+def test_normalize_query():
+    assert normalize_query("  What is an ETF?? ") == "what is an etf"
+    assert normalize_query("401k vs. IRA") == normalize_query("401K VS IRA")
@@ -0,0 +1,61 @@
+import pytest
+
+from src.tools.serializers import MAGIC, Serializer, decode_value, get_serializer
+
+
+def _quote():
+    return {
+        "symbol": "AAPL",
+        "last_price": 189.25,
+        "previous_close": 187.5,
+        "market_cap": 2.9e12,
+        "currency": "USD",
+        "history_5d": [185.0, 186.5, 187.25, 187.5, 189.25],
+        "history_dates": ["2026-10-09", "2026-10-12", "2026-10-13", "2026-10-14", "2026-10-15"],
+        "pct_change": 0.9333,
+        "source": "yfinance",
+        "stale": False,
+        "error": None,
+    }
+
+
+@pytest.mark.parametrize("name", ["json", "packed", "packed+zlib"])
+def test_round_trip(name):
+    payload = _quote()
+    assert get_serializer(name).loads(get_serializer(name).dumps(payload)) == payload
+
+
+@pytest.mark.parametrize("name", ["packed", "packed+zlib"])
+def test_packed_values_are_binary(name):
+    raw = get_serializer(name).dumps(_quote())
+    assert isinstance(raw, bytes) and raw.startswith(MAGIC)
+
+
+def test_long_history_round_trips_through_zlib():
+    payload = {"closes": [100.0 + i / 7 for i in range(2000)], "nested": [{"a": [1.5, 2.5, 3.5, 4.5]}]}
+    ser = get_serializer("packed+zlib")
+    raw = ser.dumps(payload)
+    assert len(raw) < len(get_serializer("json").dumps(payload))
+    assert ser.loads(raw) == payload
+
+
+def test_non_dates_that_look_like_dates_stay_strings():
+    payload = {"labels": ["2026-02-30", "2026-10-15", "2026-10-16", "2026-10-17"]}
+    assert get_serializer("packed").loads(get_serializer("packed").dumps(payload)) == payload
+
+
+def test_every_serializer_reads_json_rows():
+    row = get_serializer("json").dumps(_quote())
+    assert decode_value(row) == _quote()
+    assert get_serializer("packed").loads(row) == _quote()
+    assert decode_value(row.encode("utf-8")) == _quote()
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError):
+        get_serializer("pickle")
+
+
+def test_base_serializer_is_abstract():
+    with pytest.raises(TypeError):
+        Serializer()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from src.tools.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"price": 1.0}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("quote:AAPL", fetch))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    # Wait until every follower has joined the leader's call
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [{"price": 1.0}] * 8
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.stats() == {"issued": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    a, a_leader = flight.begin("quote:A")
+    b, b_leader = flight.begin("quote:B")
+    assert a_leader and b_leader and a is not b
+    flight.finish("quote:A", a, value=1)
+    flight.finish("quote:B", b, value=2)
+    assert (a.wait(0), b.wait(0)) == (1, 2)
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    call, leader = flight.begin("quote:X")
+    follower, follower_leader = flight.begin("quote:X")
+    assert leader and not follower_leader and follower is call
+
+    flight.finish("quote:X", call, error=ValueError("no price"))
+    with pytest.raises(ValueError):
+        follower.wait(0)
+
+
+def test_finished_key_starts_a_new_call():
+    flight = SingleFlight()
+    assert flight.do("k", lambda: 1) == (1, False)
+    assert flight.do("k", lambda: 2) == (2, False)
+    assert flight.stats()["issued"] == 2
+
+
+def test_wait_times_out():
+    flight = SingleFlight()
+    flight.begin("slow")
+    follower, _ = flight.begin("slow")
+    with pytest.raises(TimeoutError):
+        follower.wait(0.01)
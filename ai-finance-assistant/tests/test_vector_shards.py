@@ -0,0 +1,85 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from src.config import settings
+from src.tools import rag
+from src.tools.local_embeddings import HashingEmbeddings
+from src.tools.vector_shards import SHARDS_DIRNAME, shard_catalog
+
+
+def _assert_shards_and_bm25_aligned(vs):
+    """BM25 postings and the category shards describe exactly the indexed chunks."""
+    embedder = HashingEmbeddings(dim=settings.local_embedding_dim)
+    ntotal = vs.index.ntotal
+    ids = [vs.index_to_docstore_id[pos] for pos in range(ntotal)]
+    docs = [vs.docstore.search(doc_id) for doc_id in ids]
+    expected = np.asarray(embedder.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+
+    bm25 = rag.get_bm25_index()
+    assert sorted(bm25.doc_ids) == sorted(ids)
+    fresh = rag._build_bm25(vs)
+    for query in ("roth ira", "municipal bond tax", "etf basket", "crypto"):
+        assert dict(bm25.search(query, ntotal)) == pytest.approx(dict(fresh.search(query, ntotal)))
+
+    catalog = shard_catalog(rag._index_dir())
+    assert sum(e["count"] for e in catalog.values()) == ntotal
+    categories = {doc_id: doc.metadata["category"] for doc_id, doc in zip(ids, docs)}
+    assert set(catalog) == set(categories.values())
+    for category in catalog:
+        shard = rag.get_category_shard(category)
+        assert shard.ids and all(categories[i] == category for i in shard.ids)
+        # Shard vectors are the same un-quantized vectors as the global index
+        positions = [ids.index(i) for i in shard.ids]
+        assert np.allclose(shard.index.reconstruct_n(0, len(shard)), expected[positions], atol=1e-6)
+
+
+def test_full_build_writes_every_shard(kb):
+    rag.refresh_kb_index()
+    _assert_shards_and_bm25_aligned(rag.build_or_load_faiss())
+
+
+def test_incremental_refresh_rewrites_only_touched_shards(kb, write_article):
+    rag.refresh_kb_index()
+    untouched_shard = shard_catalog(rag._index_dir())["ETFs"]["file"]
+
+    (kb / "04_401k.txt").unlink()
+    write_article(kb, "03_roth.txt", "Retirement", "A Roth IRA is funded with after-tax dollars. Withdrawals after 59.5 are tax free.")
+    write_article(kb, "06_hsa.txt", "Healthcare", "A health savings account pairs with a high deductible health plan.")
+    rag.refresh_kb_index()
+
+    _assert_shards_and_bm25_aligned(rag.build_or_load_faiss())
+    catalog = shard_catalog(rag._index_dir())
+    assert catalog["ETFs"]["file"] == untouched_shard
+    assert "Healthcare" in catalog
+
+    rag._VECTORSTORE, rag._BM25, rag._INDEX_VERSION = None, None, None
+    rag._SHARDS.clear()
+    _assert_shards_and_bm25_aligned(rag.build_or_load_faiss())
+
+
+def test_removing_a_categorys_last_file_drops_its_shard(kb):
+    rag.refresh_kb_index()
+    (kb / "05_munis.txt").unlink()
+    rag.refresh_kb_index()
+
+    assert "Tax" not in shard_catalog(rag._index_dir())
+    assert rag.get_category_shard("Tax") is None
+    _assert_shards_and_bm25_aligned(rag.build_or_load_faiss())
+
+
+def test_missing_shards_fall_back_to_the_filtered_search(kb):
+    rag.refresh_kb_index()
+    shutil.rmtree(rag._index_dir() / SHARDS_DIRNAME)
+    rag._SHARDS.clear()
+
+    # Requests never rebuild shards: the global search is post-filtered instead
+    assert rag.get_category_shard("Retirement") is None
+    assert not (rag._index_dir() / SHARDS_DIRNAME).exists()
+    result = rag.get_rag_retriever("Retirement").retrieve("roth ira employer match")
+    assert result.docs and all(d.metadata["category"] == "Retirement" for d in result.docs)
+
+    # ... the next refresh puts them back, even with no KB changes
+    assert rag.refresh_kb_index()["chunks_embedded"] == 0
+    assert rag.get_category_shard("Retirement") is not None